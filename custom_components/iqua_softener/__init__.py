@@ -2,37 +2,69 @@
 from __future__ import annotations
 
 import logging
+import time
 from datetime import timedelta
+from typing import Any
 
+import homeassistant.helpers.config_validation as cv
 import homeassistant.helpers.device_registry as dr
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.helpers.typing import ConfigType
+from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
 from homeassistant.const import (
     CONF_USERNAME,
     CONF_PASSWORD,
 )
 
-from iqua_softener import (
-    IquaSoftener,
-    IquaSoftenerData,
-    IquaSoftenerException,
-)
+from .api import IquaSoftenerApi, async_get_session
 
 from .const import (
+    DATA_PENDING,
     DOMAIN,
     CONF_DEVICE_SERIAL_NUMBER,
-    CONF_INTERVAL_SENSORS,
+    CONF_LEAK_FLOW_MINUTES,
+    CONF_LIVE_UPDATES,
+    CONF_PRECISION,
+    CONF_RECOMPUTE_TIMESTAMPS,
+    CONF_RECORD_PAYLOADS,
+    CONF_REPLAY_PAYLOADS,
+    CONF_REPLAY_SPEED,
+    CONF_SENSORS,
     CONFIG_OPTIONS,
     DEFAULT_BRAND,
-    DEFAULT_INTERVAL_SENSORS,
+    DEFAULT_LEAK_FLOW_MINUTES,
+    DEFAULT_LIVE_UPDATES,
+    DEFAULT_RECOMPUTE_TIMESTAMPS,
+    DEFAULT_RECORD_PAYLOADS,
+    DEFAULT_REPLAY_PAYLOADS,
+    DEFAULT_REPLAY_SPEED,
     IQUA_PLATFORMS,
+    RELOAD_OPTIONS,
+)
+from .coordinator import (
+    IQuaDeviceCoordinator,
+    async_get_account,
+    async_release_account,
 )
-from .models import IQuaEntryData
+from .fleet import async_get_fleet
+from .history import IQuaHistory
+from .models import IQuaEntryData, IquaSoftenerData
+from .replay import PayloadRecorder, async_get_replay_api
+from .scheduler import PollSettings
+from .services import async_setup_services
+from .storage import IQuaSnapshotStore
 
 _LOGGER = logging.getLogger(__name__)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the IQua services."""
+    async_setup_services(hass)
+    return True
+
 
 @callback
 def _async_import_options_from_data_if_missing(hass: HomeAssistant, entry: ConfigEntry):
@@ -51,64 +83,109 @@ def _async_import_options_from_data_if_missing(hass: HomeAssistant, entry: Confi
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up the WeatherFlow config entries."""
+    setup_started = time.monotonic()
     _async_import_options_from_data_if_missing(hass, entry)
 
     _LOGGER.debug("USER: %s", entry.data[CONF_USERNAME])
-    iqua_api = IquaSoftener(
-        entry.data[CONF_USERNAME],
-        entry.data[CONF_PASSWORD],
+    account = async_get_account(
+        hass,
+        async_get_session(hass, entry.data[CONF_USERNAME], entry.data[CONF_PASSWORD]),
+    )
+    replay_api = None
+    if entry.options.get(CONF_REPLAY_PAYLOADS, DEFAULT_REPLAY_PAYLOADS):
+        replay_api = await async_get_replay_api(
+            hass,
+            entry.data[CONF_DEVICE_SERIAL_NUMBER],
+            entry.options.get(CONF_REPLAY_SPEED, DEFAULT_REPLAY_SPEED),
+        )
+    coordinator = account.async_add_device(
         entry.data[CONF_DEVICE_SERIAL_NUMBER],
+        PollSettings.from_entry(entry),
+        replay_api,
     )
+    iqua_api = coordinator.iqua_api
+    if entry.options.get(CONF_RECORD_PAYLOADS, DEFAULT_RECORD_PAYLOADS) and isinstance(
+        iqua_api, IquaSoftenerApi
+    ):
+        iqua_api.recorder = PayloadRecorder(hass, entry.data[CONF_DEVICE_SERIAL_NUMBER])
+    _async_set_sensor_options(coordinator, entry)
+    # A replay must leave the cached snapshot, history and statistics alone.
+    coordinator.history = IQuaHistory(
+        hass,
+        entry.data[CONF_DEVICE_SERIAL_NUMBER],
+        persistent=not coordinator.replaying,
+    )
+    if not coordinator.replaying:
+        coordinator.snapshot_store = IQuaSnapshotStore(hass, entry.entry_id)
+        await coordinator.history.async_load()
 
-    try:
-        device_data: IquaSoftenerData = await hass.async_add_executor_job(
-            iqua_api.get_data
+    pending = hass.data[DOMAIN].get(DATA_PENDING, {})
+    serial = entry.data[CONF_DEVICE_SERIAL_NUMBER]
+    if (pending_data := pending.pop(serial, None)) is not None:
+        _LOGGER.debug("Starting %s from the config flow data", entry.title)
+        coordinator.async_set_updated_data(pending_data)
+    elif (
+        coordinator.snapshot_store is not None
+        and (cached_data := await coordinator.snapshot_store.async_load()) is not None
+    ):
+        _LOGGER.debug("Starting %s from cached data", entry.title)
+        coordinator.async_set_cached_data(cached_data)
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} refresh {entry.entry_id}"
         )
+    else:
+        try:
+            await coordinator.async_config_entry_first_refresh()
 
-    except IquaSoftenerException as notreadyerror:
-        _LOGGER.debug("Something went wrong when trying to retrieve data.")
-        raise ConfigEntryNotReady from notreadyerror
+        except (ConfigEntryAuthFailed, ConfigEntryNotReady):
+            _LOGGER.debug("Something went wrong when trying to retrieve data.")
+            await async_release_account(
+                hass, account, entry.data[CONF_DEVICE_SERIAL_NUMBER]
+            )
+            raise
 
+    device_data: IquaSoftenerData = coordinator.data
     if entry.unique_id is None:
         hass.config_entries.async_update_entry(
             entry, unique_id=CONF_DEVICE_SERIAL_NUMBER
         )
 
-    async def async_update_data():
-        """Obtain the latest data from WeatherFlow."""
-        try:
-            data: IquaSoftenerData = await hass.async_add_executor_job(
-                iqua_api.get_data
-            )
-            return data
-
-        except IquaSoftenerException as err:
-            raise UpdateFailed(f"Error while retreiving data: {err}") from err
-
-    coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name=DOMAIN,
-        update_method=async_update_data,
-        update_interval=timedelta(
-            seconds=entry.options.get(CONF_INTERVAL_SENSORS, DEFAULT_INTERVAL_SENSORS)
-        ),
-    )
-    await coordinator.async_config_entry_first_refresh()
-    if not coordinator.last_update_success:
-        raise ConfigEntryNotReady
-
-    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = IQuaEntryData(
+    entry_data = hass.data.setdefault(DOMAIN, {})[entry.entry_id] = IQuaEntryData(
+        account=account,
         coordinator=coordinator,
         iqua_api=iqua_api,
-        device_data=device_data,
+        reload_options=_reload_options(entry),
     )
 
+    fleet = async_get_fleet(hass)
+
+    @callback
+    def _async_update_fleet() -> None:
+        fleet.async_update_device(
+            entry.data[CONF_DEVICE_SERIAL_NUMBER], coordinator.data
+        )
+
+    _async_update_fleet()
+    entry.async_on_unload(coordinator.async_add_listener(_async_update_fleet))
+
     await _async_get_or_create_nvr_device_in_registry(hass, entry, device_data)
     await hass.config_entries.async_forward_entry_setups(entry, IQUA_PLATFORMS)
 
+    if replay_api is not None:
+        entry.async_create_background_task(
+            hass,
+            replay_api.async_run(coordinator.async_set_updated_data),
+            f"{DOMAIN} replay {entry.entry_id}",
+        )
+    elif entry.options.get(CONF_LIVE_UPDATES, DEFAULT_LIVE_UPDATES):
+        account.live.async_start(entry.data[CONF_DEVICE_SERIAL_NUMBER])
+
     entry.async_on_unload(entry.add_update_listener(_async_options_updated))
 
+    entry_data.setup_duration = time.monotonic() - setup_started
+    _LOGGER.debug(
+        "Setup of %s took %.3f seconds", entry.title, entry_data.setup_duration
+    )
     return True
 
 
@@ -128,12 +205,64 @@ async def _async_get_or_create_nvr_device_in_registry(
     )
 
 
+@callback
+def _async_set_sensor_options(
+    coordinator: IQuaDeviceCoordinator, entry: ConfigEntry
+) -> None:
+    coordinator.async_set_sensor_options(
+        entry.options.get(CONF_SENSORS),
+        entry.options.get(CONF_PRECISION, {}),
+        entry.options.get(CONF_RECOMPUTE_TIMESTAMPS, DEFAULT_RECOMPUTE_TIMESTAMPS),
+    )
+    coordinator.leaks.flow_duration = timedelta(
+        minutes=entry.options.get(CONF_LEAK_FLOW_MINUTES, DEFAULT_LEAK_FLOW_MINUTES)
+    )
+
+
+def _reload_options(entry: ConfigEntry) -> dict[str, Any]:
+    """Return the options that need a reload, defaults filled in."""
+    return {
+        key: entry.options.get(key, default) for key, default in RELOAD_OPTIONS.items()
+    }
+
+
 async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry):
-    """Update options."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    """Apply changed options to the running entry.
+
+    Polling and live update options are applied in place. Only options that
+    add or remove entities reload the entry.
+    """
+    entry_data: IQuaEntryData = hass.data[DOMAIN][entry.entry_id]
+    if _reload_options(entry) != entry_data.reload_options:
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    account = entry_data.account
+    device_serial_number = entry.data[CONF_DEVICE_SERIAL_NUMBER]
+    account.async_update_settings(device_serial_number, PollSettings.from_entry(entry))
+    if entry.options.get(CONF_LIVE_UPDATES, DEFAULT_LIVE_UPDATES):
+        account.live.async_start(device_serial_number)
+    else:
+        account.live.async_stop(device_serial_number)
+    _async_set_sensor_options(entry_data.coordinator, entry)
+    entry_data.coordinator.async_update_listeners()
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the cached data, history and recording of a deleted entry."""
+    await IQuaSnapshotStore(hass, entry.entry_id).async_remove()
+    await IQuaHistory(hass, entry.data[CONF_DEVICE_SERIAL_NUMBER]).async_remove()
+    await PayloadRecorder(hass, entry.data[CONF_DEVICE_SERIAL_NUMBER]).async_remove()
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload IQua entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, IQUA_PLATFORMS)
+    if unload_ok:
+        entry_data: IQuaEntryData = hass.data[DOMAIN].pop(entry.entry_id)
+        fleet = async_get_fleet(hass)
+        fleet.async_remove_device(entry.data[CONF_DEVICE_SERIAL_NUMBER])
+        await async_release_account(
+            hass, entry_data.account, entry.data[CONF_DEVICE_SERIAL_NUMBER]
+        )
     return unload_ok
@@ -0,0 +1,449 @@
+"""Async client for the Ecowater iQua cloud API."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any
+from zoneinfo import ZoneInfo
+
+from aiohttp import ClientError, ClientSession, ClientTimeout
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DATA_SESSIONS,
+    DOMAIN,
+    IquaSoftenerState,
+    IquaSoftenerVolumeUnit,
+)
+from .governor import RequestGovernor
+from .metrics import IQuaMetrics
+from .models import IquaSoftenerData, IquaSoftenerException
+
+if TYPE_CHECKING:
+    from .replay import PayloadRecorder
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_API_BASE_URL = "https://apioem.ecowater.com/v1"
+DEFAULT_USER_AGENT = "okhttp/3.12.1"
+DEFAULT_TIMEOUT = ClientTimeout(total=30)
+SIGNIN_PATH = "/auth/signin"
+
+# Dashboard keys sent by the live endpoint and the IquaSoftenerData field
+# parsed from them, validated like the dashboard fields.
+LIVE_FIELDS = {
+    "power": "state",
+    "current_water_flow_gpm": "current_water_flow",
+    "gallons_used_today": "today_use",
+    "total_outlet_water_gals": "total_water_available",
+}
+
+# Renew the token slightly before the server side expiry.
+TOKEN_EXPIRY_MARGIN = 60
+
+
+def _parse_model(data: dict[str, Any]) -> str:
+    return f"{data['model_description']['value']} ({data['model_id']['value']})"
+
+
+def _parse_device_date_time(data: dict[str, Any]) -> datetime:
+    device_date_time = datetime.fromisoformat(data["device_date"])
+    if device_date_time.tzinfo is None and data.get("tz"):
+        device_date_time = device_date_time.replace(tzinfo=ZoneInfo(data["tz"]))
+    return device_date_time
+
+
+def _parse_number(
+    key: str, attribute: str = "value", maximum: float | None = None
+) -> Callable[[dict[str, Any]], float]:
+    def parse(data: dict[str, Any]) -> float:
+        value = data[key][attribute]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError(f"{key} is not a number: {value!r}")
+        if value < 0 or (maximum is not None and value > maximum):
+            raise ValueError(f"{key} is out of range: {value!r}")
+        return value
+
+    return parse
+
+
+def _parse_salt_level(data: dict[str, Any]) -> float:
+    return _parse_number("salt_level_tenths")(data) / 10
+
+
+# Every IquaSoftenerData field read from a dashboard payload and its parser.
+# Each field is validated on its own, so one bad value does not discard the
+# rest of the payload.
+DASHBOARD_FIELDS: dict[str, Callable[[dict[str, Any]], Any]] = {
+    "model": _parse_model,
+    "software_version": lambda data: data["base_software_version"]["value"],
+    "state": lambda data: IquaSoftenerState(data["power"]),
+    "device_date_time": _parse_device_date_time,
+    "volume_unit": lambda data: IquaSoftenerVolumeUnit(
+        int(data["volume_unit_enum"]["value"])
+    ),
+    "current_water_flow": _parse_number("current_water_flow_gpm", "converted_value"),
+    "today_use": _parse_number("gallons_used_today", "converted_value"),
+    "average_daily_use": _parse_number("avg_daily_use_gals", "converted_value"),
+    "total_water_available": _parse_number(
+        "total_outlet_water_gals", "converted_value"
+    ),
+    "days_since_last_regeneration": _parse_number("days_since_last_recharge"),
+    "salt_level": _parse_salt_level,
+    "salt_level_percent": _parse_number("salt_level_tenths", "percent", 100),
+    "out_of_salt_estimated_days": _parse_number("out_of_salt_estimate_days"),
+    "hardness_grains": _parse_number("hardness_grains"),
+    "water_shutoff_valve_state": lambda data: data["water_shutoff_valve"]["value"],
+}
+
+
+def parse_dashboard(
+    data: dict[str, Any],
+    previous: IquaSoftenerData | None = None,
+    timestamp: datetime | None = None,
+) -> IquaSoftenerData:
+    """Convert a dashboard payload into IquaSoftenerData.
+
+    A field that fails validation keeps its value from previous and is listed
+    in invalid_fields. Only a payload without a single valid field is rejected.
+    The data is stamped with timestamp, the time the payload was received,
+    which defaults to now.
+    """
+    values: dict[str, Any] = {}
+    invalid = set()
+    for name, parse in DASHBOARD_FIELDS.items():
+        try:
+            values[name] = parse(data)
+        except (KeyError, TypeError, ValueError) as err:
+            _LOGGER.debug("Invalid %s in dashboard data: %s", name, err)
+            invalid.add(name)
+            values[name] = None if previous is None else getattr(previous, name)
+
+    if len(invalid) == len(DASHBOARD_FIELDS):
+        raise IquaSoftenerException("Invalid dashboard data: no valid field")
+    return IquaSoftenerData(
+        timestamp=timestamp or dt_util.utcnow(),
+        invalid_fields=frozenset(invalid),
+        **values,
+    )
+
+
+def parse_live_update(message: dict[str, Any]) -> dict[str, Any]:
+    """Return the valid IquaSoftenerData fields present in a live update message.
+
+    Each field goes through its dashboard parser, a field that fails validation
+    is left out so the coordinator keeps its last valid value.
+    """
+    data = message.get("data", message) if isinstance(message, dict) else None
+    if not isinstance(data, dict):
+        raise IquaSoftenerException(f"Invalid live update: {message!r}")
+    changes: dict[str, Any] = {}
+    for key, name in LIVE_FIELDS.items():
+        if key not in data:
+            continue
+        try:
+            changes[name] = DASHBOARD_FIELDS[name](data)
+        except (KeyError, TypeError, ValueError) as err:
+            _LOGGER.debug("Invalid %s in live update: %s", name, err)
+    return changes
+
+
+class IquaSoftenerAuthError(IquaSoftenerException):
+    """Raised when the iQua cloud rejects the credentials or token."""
+
+
+class IquaSoftenerTransientError(IquaSoftenerException):
+    """Raised for rate limiting, server and connection errors worth retrying."""
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        """Initialize the error."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    """Return the Retry-After header as a number of seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class IquaSoftenerSession:
+    """Authenticated iQua cloud session shared by every device of an account."""
+
+    def __init__(
+        self,
+        session: ClientSession,
+        username: str,
+        password: str,
+        api_base_url: str | None = None,
+    ) -> None:
+        """Initialize the session."""
+        self._session = session
+        self.username = username
+        self._password = password
+        self._api_base_url = (api_base_url or DEFAULT_API_BASE_URL).rstrip("/")
+        self._token: str | None = None
+        self._token_type: str | None = None
+        self._token_expiration: float = 0
+        self._token_lock = asyncio.Lock()
+        self.auth_failed = False
+        self.login_count = 0
+        self.fetch_count = 0
+        self.governor = RequestGovernor(retryable=(IquaSoftenerTransientError,))
+        self.metrics = IQuaMetrics()
+
+    @property
+    def client_session(self) -> ClientSession:
+        """Return the aiohttp session used for the cloud."""
+        return self._session
+
+    @property
+    def token_valid(self) -> bool:
+        """Return True if the cached token can still be used."""
+        return self._token is not None and time.monotonic() < self._token_expiration
+
+    def has_password(self, password: str) -> bool:
+        """Return True if the session signs in with this password."""
+        return password == self._password
+
+    def update_password(self, password: str) -> None:
+        """Replace the password and drop the cached token if it changed."""
+        if password != self._password:
+            self._password = password
+            self.auth_failed = False
+            self.invalidate_token()
+
+    def invalidate_token(self) -> None:
+        """Forget the cached token so the next request signs in again."""
+        self._token = None
+        self._token_expiration = 0
+
+    async def async_request(self, method: str, path: str, **kwargs) -> dict[str, Any]:
+        """Perform an authenticated request, signing in again on expiry or 401."""
+        self._raise_if_auth_failed()
+        if not self.token_valid:
+            await self._async_ensure_token()
+
+        token = self._token
+        self.fetch_count += 1
+        try:
+            return await self._async_request(
+                method, path, headers=self._auth_headers, **kwargs
+            )
+        except IquaSoftenerAuthError:
+            _LOGGER.debug("Token for %s was rejected, signing in again", self.username)
+            await self._async_ensure_token(rejected=token)
+            self.fetch_count += 1
+            return await self._async_request(
+                method, path, headers=self._auth_headers, **kwargs
+            )
+        finally:
+            _LOGGER.debug(
+                "iQua session %s: %s logins, %s data requests",
+                self.username,
+                self.login_count,
+                self.fetch_count,
+            )
+
+    @property
+    def _auth_headers(self) -> dict[str, str]:
+        return {"Authorization": f"{self._token_type} {self._token}"}
+
+    def _raise_if_auth_failed(self) -> None:
+        if self.auth_failed:
+            # Signing in again with a rejected password only risks a lockout.
+            raise IquaSoftenerAuthError(
+                f"Credentials of {self.username} were rejected, reauthenticate"
+            )
+
+    async def _async_ensure_token(self, rejected: str | None = None) -> None:
+        """Sign in unless a concurrent request already renewed the token.
+
+        Requests that find the token expired or rejected at the same time wait
+        on the lock, so the account signs in once instead of once per request.
+        """
+        async with self._token_lock:
+            self._raise_if_auth_failed()
+            if self.token_valid and self._token != rejected:
+                return
+            await self._async_update_token()
+
+    async def _async_update_token(self) -> None:
+        """Sign in and store the bearer token."""
+        self.invalidate_token()
+        self.login_count += 1
+        try:
+            data = await self._async_request(
+                "POST",
+                SIGNIN_PATH,
+                auth_status=(400, 401, 403),
+                json={"username": self.username, "password": self._password},
+            )
+        except IquaSoftenerAuthError:
+            self.auth_failed = True
+            raise
+        try:
+            self._token = data["access_token"]
+            self._token_type = data.get("token_type", "Bearer")
+            self._token_expiration = (
+                time.monotonic() + int(data["expires_in"]) - TOKEN_EXPIRY_MARGIN
+            )
+        except (KeyError, TypeError, ValueError) as err:
+            raise IquaSoftenerException(f"Invalid sign in response: {err}") from err
+
+    async def _async_request(self, method: str, path: str, **kwargs) -> dict[str, Any]:
+        """Perform a request through the account's request governor."""
+        with self.metrics.measure("login" if path == SIGNIN_PATH else "request"):
+            return await self.governor.async_call(
+                self._async_http_request, method, path, **kwargs
+            )
+
+    async def _async_http_request(
+        self,
+        method: str,
+        path: str,
+        headers: dict[str, str] | None = None,
+        auth_status: tuple[int, ...] = (401, 403),
+        **kwargs,
+    ) -> dict[str, Any]:
+        """Perform a request and return the data part of the response."""
+        with self.metrics.measure("http"):
+            try:
+                async with self._session.request(
+                    method,
+                    f"{self._api_base_url}{path}",
+                    headers={"User-Agent": DEFAULT_USER_AGENT, **(headers or {})},
+                    timeout=DEFAULT_TIMEOUT,
+                    **kwargs,
+                ) as response:
+                    if response.status in auth_status:
+                        raise IquaSoftenerAuthError(
+                            f"Not authorized ({response.status}) for {path} request"
+                        )
+                    if response.status == 429 or response.status >= 500:
+                        raise IquaSoftenerTransientError(
+                            f"Invalid status ({response.status}) for {path} request",
+                            _parse_retry_after(response.headers.get("Retry-After")),
+                        )
+                    if response.status != 200:
+                        raise IquaSoftenerException(
+                            f"Invalid status ({response.status}) for {path} request"
+                        )
+                    response_data = await response.json(content_type=None)
+            except (ClientError, TimeoutError) as err:
+                raise IquaSoftenerTransientError(
+                    f"Error requesting {path}: {err}"
+                ) from err
+
+        if response_data.get("code") != "OK":
+            raise IquaSoftenerException(
+                f"Invalid response code for {path} request: "
+                f"{response_data.get('code')} ({response_data.get('message')})"
+            )
+        return response_data["data"]
+
+
+@callback
+def async_get_session(
+    hass: HomeAssistant, username: str, password: str
+) -> IquaSoftenerSession:
+    """Return the shared session for an account, creating it if needed.
+
+    Sessions live in hass.data so the token survives config entry reloads.
+    """
+    sessions: dict[str, IquaSoftenerSession] = hass.data.setdefault(
+        DOMAIN, {}
+    ).setdefault(DATA_SESSIONS, {})
+    if (iqua_session := sessions.get(username)) is None:
+        iqua_session = sessions[username] = IquaSoftenerSession(
+            async_get_clientsession(hass), username, password
+        )
+    else:
+        iqua_session.update_password(password)
+    return iqua_session
+
+
+@callback
+def async_get_validation_session(
+    hass: HomeAssistant, username: str, password: str
+) -> IquaSoftenerSession:
+    """Return a session to validate credentials with.
+
+    The shared session is reused when the password matches, so its token saves
+    a sign in. Otherwise a standalone session is returned, keeping a wrong
+    password away from the session used by the configured devices.
+    """
+    sessions: dict[str, IquaSoftenerSession] = hass.data.get(DOMAIN, {}).get(
+        DATA_SESSIONS, {}
+    )
+    if (
+        (iqua_session := sessions.get(username)) is not None
+        and iqua_session.has_password(password)
+        and not iqua_session.auth_failed
+    ):
+        return iqua_session
+    return IquaSoftenerSession(async_get_clientsession(hass), username, password)
+
+
+@callback
+def async_adopt_session(hass: HomeAssistant, iqua_session: IquaSoftenerSession) -> None:
+    """Share a validated session, so setup starts with its token."""
+    hass.data.setdefault(DOMAIN, {}).setdefault(DATA_SESSIONS, {}).setdefault(
+        iqua_session.username, iqua_session
+    )
+
+
+class IquaSoftenerApi:
+    """Async replacement for IquaSoftener for a single device."""
+
+    def __init__(self, session: IquaSoftenerSession, device_serial_number: str) -> None:
+        """Initialize the client."""
+        self.session = session
+        self._device_serial_number = device_serial_number
+        self.recorder: PayloadRecorder | None = None
+
+    @property
+    def device_serial_number(self) -> str:
+        """Return the serial number of the device."""
+        return self._device_serial_number
+
+    async def async_get_data(
+        self, previous: IquaSoftenerData | None = None
+    ) -> IquaSoftenerData:
+        """Fetch the dashboard for the device.
+
+        Fields that fail validation keep their value from previous.
+        """
+        started = time.monotonic()
+        data = await self.session.async_request(
+            "GET", f"/system/{self._device_serial_number}/dashboard"
+        )
+        if self.recorder is not None:
+            self.recorder.async_record(data, time.monotonic() - started)
+        with self.session.metrics.measure("parse"):
+            return parse_dashboard(data, previous)
+
+    async def async_get_live_uri(self) -> str:
+        """Request a websocket URI streaming live values of the device."""
+        data = await self.session.async_request(
+            "POST", f"/system/{self._device_serial_number}/live"
+        )
+        try:
+            return data["websocket_uri"]
+        except (KeyError, TypeError) as err:
+            raise IquaSoftenerException(f"Invalid live response: {err}") from err
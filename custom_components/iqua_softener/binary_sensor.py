@@ -0,0 +1,128 @@
+"""Leak detection binary sensors for IQua Water Softener."""
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorDeviceClass,
+    BinarySensorEntity,
+    BinarySensorEntityDescription,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .entity import IQuaEntity
+from .leak import LeakDetector
+from .models import IQuaEntryData
+
+
+@dataclass
+class IQuaBinarySensorEntityDescription(BinarySensorEntityDescription):
+    """Describes IQua binary sensor entity."""
+
+    value_fn: Callable[[LeakDetector], bool] = lambda leaks: False
+    attributes_fn: Callable[[LeakDetector], dict[str, Any]] | None = None
+
+
+BINARY_SENSOR_TYPES = (
+    IQuaBinarySensorEntityDescription(
+        key="continuous_flow",
+        name="Continuous water flow",
+        device_class=BinarySensorDeviceClass.PROBLEM,
+        icon="mdi:pipe-leak",
+        value_fn=lambda leaks: leaks.continuous_flow,
+        attributes_fn=lambda leaks: {"flow_since": leaks.flow_since},
+    ),
+    IQuaBinarySensorEntityDescription(
+        key="night_usage",
+        name="Night water usage",
+        device_class=BinarySensorDeviceClass.PROBLEM,
+        icon="mdi:weather-night",
+        value_fn=lambda leaks: leaks.night_usage,
+        attributes_fn=lambda leaks: {
+            "night_use": round(leaks.night_use, 1),
+            "night_baseline": None
+            if leaks.night_baseline is None
+            else round(leaks.night_baseline, 1),
+        },
+    ),
+    IQuaBinarySensorEntityDescription(
+        key="high_daily_use",
+        name="High daily water usage",
+        device_class=BinarySensorDeviceClass.PROBLEM,
+        icon="mdi:water-alert",
+        value_fn=lambda leaks: leaks.high_daily_use,
+    ),
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities
+) -> None:
+    """Set up binary sensors for IQua integration."""
+    entry_data: IQuaEntryData = hass.data[DOMAIN][entry.entry_id]
+
+    entities = []
+    for description in BINARY_SENSOR_TYPES:
+        entities.append(
+            IQuaBinarySensor(
+                entry_data.iqua_api,
+                entry_data.coordinator,
+                description,
+                entry,
+            )
+        )
+
+        _LOGGER.debug(
+            "Adding binary sensor entity %s",
+            description.name,
+        )
+
+    async_add_entities(entities)
+
+
+class IQuaBinarySensor(IQuaEntity, BinarySensorEntity):
+    """Implementation of an IQua leak detection binary sensor."""
+
+    entity_description: IQuaBinarySensorEntityDescription
+
+    def __init__(
+        self,
+        iqua_api,
+        coordinator,
+        description,
+        entries: ConfigEntry,
+    ):
+        """Initialize an IQua binary sensor."""
+        super().__init__(
+            iqua_api,
+            coordinator,
+            description,
+            entries,
+        )
+        self._attr_name = f"{DOMAIN.capitalize()} {self.entity_description.name}"
+
+    def _state_signature(self) -> tuple[Any, ...]:
+        """Return everything this sensor publishes, used to detect changes."""
+        return (self.available, self.is_on, self.extra_state_attributes)
+
+    @property
+    def is_on(self) -> bool:
+        """Return True when the leak condition is detected."""
+        return self.entity_description.value_fn(self.coordinator.leaks)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the sensor state attributes."""
+        if self.entity_description.attributes_fn is None:
+            return super().extra_state_attributes
+        return {
+            **super().extra_state_attributes,
+            **self.entity_description.attributes_fn(self.coordinator.leaks),
+        }
@@ -2,25 +2,60 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Mapping
+from typing import Any
+
 from homeassistant import config_entries
 
 from homeassistant.core import callback
+import homeassistant.helpers.config_validation as cv
 from homeassistant.const import (
     CONF_USERNAME,
     CONF_PASSWORD,
 )
 import voluptuous as vol
 
-from iqua_softener import (
-    IquaSoftener,
-    IquaSoftenerException,
+from .api import (
+    IquaSoftenerApi,
+    IquaSoftenerAuthError,
+    async_adopt_session,
+    async_get_session,
+    async_get_validation_session,
 )
 from .const import (
+    DATA_PENDING,
     DOMAIN,
     CONF_DEVICE_SERIAL_NUMBER,
+    CONF_FLEET_SENSORS,
     CONF_INTERVAL_SENSORS,
+    CONF_LEAK_FLOW_MINUTES,
+    CONF_LIVE_UPDATES,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_PRECISION,
+    CONF_RECOMPUTE_TIMESTAMPS,
+    CONF_RECORD_PAYLOADS,
+    CONF_REPLAY_PAYLOADS,
+    CONF_REPLAY_SPEED,
+    CONF_REQUEST_BUDGET,
+    CONF_SENSORS,
+    CONF_WATER_PRICE,
+    DEFAULT_FLEET_SENSORS,
     DEFAULT_INTERVAL_SENSORS,
+    DEFAULT_LEAK_FLOW_MINUTES,
+    DEFAULT_LIVE_UPDATES,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_PRECISION,
+    DEFAULT_RECOMPUTE_TIMESTAMPS,
+    DEFAULT_RECORD_PAYLOADS,
+    DEFAULT_REPLAY_PAYLOADS,
+    DEFAULT_REPLAY_SPEED,
+    DEFAULT_REQUEST_BUDGET,
+    DEFAULT_WATER_PRICE,
+    SENSOR_OPTIONS,
 )
+from .models import IQuaEntryData, IquaSoftenerData, IquaSoftenerException
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -39,6 +74,8 @@ class IquaSoftenerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    _reauth_entry: config_entries.ConfigEntry | None = None
+
     @staticmethod
     @callback
     def async_get_options_flow(config_entry):
@@ -52,24 +89,38 @@ class IquaSoftenerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         errors = {}
 
-        iqua_api = IquaSoftener(
-            user_input[CONF_USERNAME],
-            user_input[CONF_PASSWORD],
-            user_input[CONF_DEVICE_SERIAL_NUMBER],
+        unique_id = f"{DOMAIN}_{user_input[CONF_DEVICE_SERIAL_NUMBER]}"
+
+        await self.async_set_unique_id(unique_id)
+        self._abort_if_unique_id_configured()
+
+        # The dashboard request proves both the credentials and the ownership
+        # of the device, so its result is handed over to the entry setup.
+        iqua_session = async_get_validation_session(
+            self.hass, user_input[CONF_USERNAME], user_input[CONF_PASSWORD]
         )
+        iqua_api = IquaSoftenerApi(iqua_session, user_input[CONF_DEVICE_SERIAL_NUMBER])
 
         try:
-            await self.hass.async_add_executor_job(iqua_api.get_data)
+            data = await iqua_api.async_get_data()
+
+        except IquaSoftenerAuthError as err:
+            _LOGGER.debug(err)
+            if iqua_session.auth_failed:
+                errors["base"] = "invalid_auth"
+            else:
+                errors["base"] = "connection_error"
+            return await self._show_setup_form(errors)
 
         except IquaSoftenerException as err:
             _LOGGER.debug(err)
             errors["base"] = "connection_error"
             return await self._show_setup_form(errors)
 
-        unique_id = f"{DOMAIN}_{user_input[CONF_DEVICE_SERIAL_NUMBER]}"
-
-        await self.async_set_unique_id(unique_id)
-        self._abort_if_unique_id_configured()
+        async_adopt_session(self.hass, iqua_session)
+        self.hass.data.setdefault(DOMAIN, {}).setdefault(DATA_PENDING, {})[
+            user_input[CONF_DEVICE_SERIAL_NUMBER]
+        ] = data
 
         return self.async_create_entry(
             title=f"IQua {user_input[CONF_DEVICE_SERIAL_NUMBER]}",
@@ -97,6 +148,76 @@ class IquaSoftenerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors or {},
         )
 
+    async def async_step_reauth(self, entry_data: Mapping[str, Any]):
+        """Handle rejected credentials."""
+        self._reauth_entry = self.hass.config_entries.async_get_entry(
+            self.context["entry_id"]
+        )
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(self, user_input=None):
+        """Ask for the new password and swap it into the live session."""
+        errors = {}
+        entry = self._reauth_entry
+        if user_input is not None:
+            username = entry.data[CONF_USERNAME]
+            password = user_input[CONF_PASSWORD]
+            # The shared session already failed, so it validates the new
+            # password itself and keeps the token when it is accepted.
+            iqua_session = async_get_session(self.hass, username, password)
+            iqua_api = IquaSoftenerApi(
+                iqua_session, entry.data[CONF_DEVICE_SERIAL_NUMBER]
+            )
+            try:
+                data = await iqua_api.async_get_data()
+
+            except IquaSoftenerAuthError as err:
+                _LOGGER.debug(err)
+                if iqua_session.auth_failed:
+                    errors["base"] = "invalid_auth"
+                else:
+                    errors["base"] = "connection_error"
+
+            except IquaSoftenerException as err:
+                _LOGGER.debug(err)
+                errors["base"] = "connection_error"
+
+            else:
+                self._async_apply_reauth(username, password, data)
+                return self.async_abort(reason="reauth_successful")
+
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            data_schema=vol.Schema({vol.Required(CONF_PASSWORD): str}),
+            description_placeholders={"username": entry.data[CONF_USERNAME]},
+            errors=errors,
+        )
+
+    @callback
+    def _async_apply_reauth(
+        self, username: str, password: str, data: IquaSoftenerData
+    ) -> None:
+        """Store the new password in every entry of the account."""
+        domain_data = self.hass.data.get(DOMAIN, {})
+        accounts = set()
+        for entry in self._async_current_entries():
+            if entry.data[CONF_USERNAME] != username:
+                continue
+            self.hass.config_entries.async_update_entry(
+                entry, data={**entry.data, CONF_PASSWORD: password}
+            )
+            entry_data: IQuaEntryData | None = domain_data.get(entry.entry_id)
+            if entry_data is None:
+                self.hass.async_create_task(
+                    self.hass.config_entries.async_reload(entry.entry_id)
+                )
+            elif entry.entry_id == self._reauth_entry.entry_id:
+                entry_data.coordinator.async_set_updated_data(data)
+            else:
+                accounts.add(entry_data.account)
+        for account in accounts:
+            self.hass.async_create_task(account.async_request_refresh())
+
 
 class OptionsFlowHandler(config_entries.OptionsFlow):
     """Handle options."""
@@ -104,11 +225,15 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
     def __init__(self, config_entry):
         """Initialize options flow."""
         self.config_entry = config_entry
+        self._options: dict[str, Any] = {}
 
     async def async_step_init(self, user_input=None):
         """Manage the options."""
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            self._options = user_input
+            if any(key in DEFAULT_PRECISION for key in user_input[CONF_SENSORS]):
+                return await self.async_step_precision()
+            return self.async_create_entry(title="", data=self._options)
 
         return self.async_show_form(
             step_id="init",
@@ -119,10 +244,100 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                         default=self.config_entry.options.get(
                             CONF_INTERVAL_SENSORS, DEFAULT_INTERVAL_SENSORS
                         ),
-                    ): vol.All(
-                        vol.Coerce(int),
-                        vol.Range(min=DEFAULT_INTERVAL_SENSORS, max=3600),
-                    ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=30, max=86400)),
+                    vol.Optional(
+                        CONF_MIN_INTERVAL,
+                        default=self.config_entry.options.get(
+                            CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=30, max=3600)),
+                    vol.Optional(
+                        CONF_MAX_INTERVAL,
+                        default=self.config_entry.options.get(
+                            CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=300, max=86400)),
+                    vol.Optional(
+                        CONF_REQUEST_BUDGET,
+                        default=self.config_entry.options.get(
+                            CONF_REQUEST_BUDGET, DEFAULT_REQUEST_BUDGET
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=3600)),
+                    vol.Optional(
+                        CONF_LIVE_UPDATES,
+                        default=self.config_entry.options.get(
+                            CONF_LIVE_UPDATES, DEFAULT_LIVE_UPDATES
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_FLEET_SENSORS,
+                        default=self.config_entry.options.get(
+                            CONF_FLEET_SENSORS, DEFAULT_FLEET_SENSORS
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_LEAK_FLOW_MINUTES,
+                        default=self.config_entry.options.get(
+                            CONF_LEAK_FLOW_MINUTES, DEFAULT_LEAK_FLOW_MINUTES
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=5, max=1440)),
+                    vol.Optional(
+                        CONF_RECORD_PAYLOADS,
+                        default=self.config_entry.options.get(
+                            CONF_RECORD_PAYLOADS, DEFAULT_RECORD_PAYLOADS
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_REPLAY_PAYLOADS,
+                        default=self.config_entry.options.get(
+                            CONF_REPLAY_PAYLOADS, DEFAULT_REPLAY_PAYLOADS
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_REPLAY_SPEED,
+                        default=self.config_entry.options.get(
+                            CONF_REPLAY_SPEED, DEFAULT_REPLAY_SPEED
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_WATER_PRICE,
+                        default=self.config_entry.options.get(
+                            CONF_WATER_PRICE, DEFAULT_WATER_PRICE
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_SENSORS,
+                        default=self.config_entry.options.get(
+                            CONF_SENSORS, list(SENSOR_OPTIONS)
+                        ),
+                    ): cv.multi_select(SENSOR_OPTIONS),
+                    vol.Optional(
+                        CONF_RECOMPUTE_TIMESTAMPS,
+                        default=self.config_entry.options.get(
+                            CONF_RECOMPUTE_TIMESTAMPS, DEFAULT_RECOMPUTE_TIMESTAMPS
+                        ),
+                    ): bool,
+                }
+            ),
+        )
+
+    async def async_step_precision(self, user_input=None):
+        """Choose the number of decimals of the selected numeric sensors."""
+        if user_input is not None:
+            return self.async_create_entry(
+                title="", data={**self._options, CONF_PRECISION: user_input}
+            )
+
+        precision = self.config_entry.options.get(CONF_PRECISION, {})
+        return self.async_show_form(
+            step_id="precision",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(key, default=precision.get(key, default)): vol.All(
+                        vol.Coerce(int), vol.Range(min=0, max=3)
+                    )
+                    for key, default in DEFAULT_PRECISION.items()
+                    if key in self._options[CONF_SENSORS]
                 }
             ),
         )
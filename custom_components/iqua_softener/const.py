@@ -4,20 +4,99 @@ from enum import Enum, IntEnum
 
 DOMAIN = "iqua_softener"
 
+DATA_ACCOUNTS = "accounts"
+DATA_FLEET = "fleet"
+DATA_PENDING = "pending"
+DATA_SESSIONS = "sessions"
+
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 30
+
 CONF_DEVICE_SERIAL_NUMBER = "device_sn"
 CONF_INTERVAL_SENSORS = "update_interval"
+CONF_MIN_INTERVAL = "min_update_interval"
+CONF_MAX_INTERVAL = "max_update_interval"
+CONF_REQUEST_BUDGET = "request_budget"
+CONF_LIVE_UPDATES = "live_updates"
+CONF_FLEET_SENSORS = "fleet_sensors"
+CONF_SENSORS = "sensors"
+CONF_PRECISION = "precision"
+CONF_RECOMPUTE_TIMESTAMPS = "recompute_timestamps"
+CONF_LEAK_FLOW_MINUTES = "leak_flow_minutes"
+CONF_RECORD_PAYLOADS = "record_payloads"
+CONF_REPLAY_PAYLOADS = "replay_payloads"
+CONF_REPLAY_SPEED = "replay_speed"
+CONF_WATER_PRICE = "water_price"
 CONFIG_OPTIONS = [
     CONF_INTERVAL_SENSORS,
 ]
 
+ATTR_STALE = "stale"
+ATTR_LAST_VALID = "last_valid"
+
 DEFAULT_BRAND = "IQua"
 DEFAULT_ATTRIBUTION = "Data delivered by Ecowater"
 DEFAULT_INTERVAL_SENSORS = 900
+DEFAULT_MIN_INTERVAL = 60
+DEFAULT_MAX_INTERVAL = 3600
+DEFAULT_REQUEST_BUDGET = 60
+DEFAULT_LIVE_UPDATES = False
+DEFAULT_FLEET_SENSORS = False
+DEFAULT_RECOMPUTE_TIMESTAMPS = True
+DEFAULT_LEAK_FLOW_MINUTES = 60
+DEFAULT_RECORD_PAYLOADS = False
+DEFAULT_REPLAY_PAYLOADS = False
+DEFAULT_REPLAY_SPEED = 1.0
+DEFAULT_WATER_PRICE = 0.0
+
+# Sensors that can be selected in the options, with their labels.
+SENSOR_OPTIONS = {
+    "state": "Status",
+    "days_since_last_regeneration": "Last regeneration",
+    "out_of_salt_estimated_days": "Out of salt estimated day",
+    "salt_level_percent": "Salt Level",
+    "total_water_available": "Available water",
+    "current_water_flow": "Current Water Flow",
+    "today_use": "Today water usage",
+    "today_consumption": "Today water consumption",
+    "average_daily_use": "Water usage daily average",
+    "salt_per_regeneration": "Salt used per regeneration",
+    "next_regeneration": "Next regeneration forecast",
+    "out_of_salt_forecast": "Out of salt forecast",
+    "lifetime_consumption": "Lifetime water consumption",
+    "regeneration_cycle_use": "Water usage since regeneration",
+    "water_cost": "Water cost",
+}
+# Options that add or remove entities or swap the backend, needing a reload,
+# with their defaults.
+RELOAD_OPTIONS = {
+    CONF_FLEET_SENSORS: DEFAULT_FLEET_SENSORS,
+    CONF_SENSORS: list(SENSOR_OPTIONS),
+    CONF_RECORD_PAYLOADS: DEFAULT_RECORD_PAYLOADS,
+    CONF_REPLAY_PAYLOADS: DEFAULT_REPLAY_PAYLOADS,
+    CONF_REPLAY_SPEED: DEFAULT_REPLAY_SPEED,
+    CONF_WATER_PRICE: DEFAULT_WATER_PRICE,
+}
+# Numeric sensors with a configurable number of decimals, and the default.
+DEFAULT_PRECISION = {
+    "total_water_available": 0,
+    "current_water_flow": 1,
+    "today_use": 0,
+    "today_consumption": 3,
+    "average_daily_use": 0,
+    "salt_per_regeneration": 1,
+}
+# Timestamp sensors computed from a day count.
+TIMESTAMP_SENSORS = [
+    "days_since_last_regeneration",
+    "out_of_salt_estimated_days",
+]
 
-IQUA_PLATFORMS = ["sensor"]
+IQUA_PLATFORMS = ["binary_sensor", "sensor"]
 
 VOLUME_FLOW_RATE_LITERS_PER_MINUTE = "L/min"
 VOLUME_FLOW_RATE_GALLONS_PER_MINUTE = "gal/min"
+LITERS_PER_GALLON = 3.785411784
 
 
 class IquaSoftenerVolumeUnit(IntEnum):
@@ -0,0 +1,371 @@
+"""Data update coordinators for the IQua Water Softener integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from homeassistant import config_entries
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .api import (
+    DASHBOARD_FIELDS,
+    IquaSoftenerApi,
+    IquaSoftenerAuthError,
+    IquaSoftenerSession,
+)
+from .const import DATA_ACCOUNTS, DOMAIN, TIMESTAMP_SENSORS
+from .history import IQuaHistory
+from .leak import LeakDetector
+from .metrics import IQuaMetrics
+from .models import IquaSoftenerData, IquaSoftenerException
+from .projection import SENSOR_KEYS, SensorProjection, project_snapshot
+from .push import IQuaLiveUpdates
+from .replay import IquaSoftenerReplayApi
+from .scheduler import AdaptivePollScheduler, PollSettings
+from .storage import IQuaSnapshotStore
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class IQuaDeviceCoordinator(DataUpdateCoordinator[IquaSoftenerData]):
+    """Coordinator for a single softener, fed by its account coordinator."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        account: IQuaAccountCoordinator,
+        iqua_api: IquaSoftenerApi | IquaSoftenerReplayApi,
+    ) -> None:
+        """Initialize the device coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {iqua_api.device_serial_number}",
+            update_interval=None,
+        )
+        self.account = account
+        self.iqua_api = iqua_api
+        self.snapshot_store: IQuaSnapshotStore | None = None
+        self.history: IQuaHistory | None = None
+        self.is_stale = False
+        # Time each dashboard field last held a valid value.
+        self.last_valid: dict[str, datetime] = {}
+        self.leaks = LeakDetector()
+        self.written_updates = 0
+        self.skipped_updates = 0
+        self.metrics = IQuaMetrics()
+        self.sensor_keys: list[str] | None = None
+        self.precision: dict[str, int] = {}
+        self.recompute_timestamps = True
+        self._projection: dict[str, SensorProjection] = {}
+        self._projection_source: IquaSoftenerData | None = None
+
+    @property
+    def replaying(self) -> bool:
+        """Return True while the device is fed by a replay instead of the cloud."""
+        return isinstance(self.iqua_api, IquaSoftenerReplayApi)
+
+    @property
+    def projection(self) -> dict[str, SensorProjection]:
+        """Return the sensor states for the current data, computed once per update."""
+        if self._projection_source is not self.data:
+            previous, self._projection_source = self._projection_source, self.data
+            with self.metrics.measure("projection"):
+                self._projection = (
+                    self._project(self.data, previous) if self.data is not None else {}
+                )
+        return self._projection
+
+    def _project(
+        self, data: IquaSoftenerData, previous: IquaSoftenerData | None
+    ) -> dict[str, SensorProjection]:
+        keys = self.sensor_keys if self.sensor_keys is not None else SENSOR_KEYS
+        kept: dict[str, SensorProjection] = {}
+        if not self.recompute_timestamps and previous is not None:
+            # Keep timestamps whose day count did not change since the last update.
+            kept = {
+                key: self._projection[key]
+                for key in TIMESTAMP_SENSORS
+                if key in self._projection
+                and getattr(previous, key) == getattr(data, key)
+            }
+            keys = [key for key in keys if key not in kept]
+        projection = project_snapshot(
+            data,
+            keys,
+            forecaster=self.history.forecaster if self.history else None,
+            precision=self.precision,
+        )
+        projection.update(kept)
+        return projection
+
+    @callback
+    def async_set_sensor_options(
+        self,
+        sensor_keys: list[str] | None,
+        precision: dict[str, int],
+        recompute_timestamps: bool,
+    ) -> None:
+        """Choose which sensor states are computed and how."""
+        self.sensor_keys = sensor_keys
+        self.precision = precision
+        self.recompute_timestamps = recompute_timestamps
+        self._projection_source = None
+
+    @callback
+    def async_set_cached_data(self, data: IquaSoftenerData) -> None:
+        """Seed the coordinator with a cached snapshot until fresh data arrives."""
+        self.data = data
+        self.is_stale = True
+
+    @callback
+    def async_set_live_data(self, data: IquaSoftenerData) -> None:
+        """Apply a live update without recording it as a full poll."""
+        self._async_mark_valid(data)
+        self.leaks.add(data)
+        super().async_set_updated_data(data)
+
+    @callback
+    def async_set_updated_data(self, data: IquaSoftenerData) -> None:
+        """Store fresh data pushed by the account coordinator."""
+        self._async_fresh_data(data)
+        super().async_set_updated_data(data)
+
+    async def _async_update_data(self) -> IquaSoftenerData:
+        """Fetch this device only, used for the first and manual refreshes."""
+        try:
+            with self.metrics.measure("update"):
+                data = await self.iqua_api.async_get_data(self.data)
+        except IquaSoftenerAuthError as err:
+            if self.account.session.auth_failed:
+                raise ConfigEntryAuthFailed(err) from err
+            raise UpdateFailed(f"Error while retreiving data: {err}") from err
+        except IquaSoftenerException as err:
+            raise UpdateFailed(f"Error while retreiving data: {err}") from err
+
+        self._async_fresh_data(data)
+        return data
+
+    @callback
+    def _async_fresh_data(self, data: IquaSoftenerData) -> None:
+        self.is_stale = False
+        self.metrics.mark_success()
+        self._async_mark_valid(data)
+        self.leaks.add(data)
+        if self.snapshot_store is not None:
+            self.snapshot_store.async_save(data)
+        if self.history is not None:
+            self.history.async_add(data)
+
+    @callback
+    def _async_mark_valid(self, data: IquaSoftenerData) -> None:
+        now = dt_util.utcnow()
+        for name in DASHBOARD_FIELDS:
+            if name not in data.invalid_fields:
+                self.last_valid[name] = now
+
+
+class IQuaAccountCoordinator(DataUpdateCoordinator[dict[str, IquaSoftenerData]]):
+    """Polls every softener of one iQua account on a single schedule."""
+
+    def __init__(self, hass: HomeAssistant, session: IquaSoftenerSession) -> None:
+        """Initialize the account coordinator.
+
+        The account is shared by the entries of its softeners, so it is not
+        bound to the entry that happens to create it: that entry's unload
+        would shut it down and only that entry would be asked to reauthenticate.
+        """
+        token = config_entries.current_entry.set(None)
+        try:
+            super().__init__(
+                hass,
+                _LOGGER,
+                name=f"{DOMAIN} {session.username}",
+                update_interval=None,
+            )
+        finally:
+            config_entries.current_entry.reset(token)
+        self.session = session
+        self.devices: dict[str, IQuaDeviceCoordinator] = {}
+        self.errors: dict[str, Exception] = {}
+        self.scheduler: AdaptivePollScheduler | None = None
+        self._settings: dict[str, PollSettings] = {}
+        self._unsub_fan_out: CALLBACK_TYPE | None = None
+        self.live = IQuaLiveUpdates(hass, self)
+        self.metrics = IQuaMetrics()
+        self._refresh_task: asyncio.Task[None] | None = None
+
+    @callback
+    def async_add_device(
+        self,
+        device_serial_number: str,
+        settings: PollSettings,
+        iqua_api: IquaSoftenerApi | IquaSoftenerReplayApi | None = None,
+    ) -> IQuaDeviceCoordinator:
+        """Register a softener and return its device coordinator.
+
+        The device is fetched from the cloud unless another backend, such as a
+        replay of recorded payloads, is given.
+        """
+        if iqua_api is None:
+            iqua_api = IquaSoftenerApi(self.session, device_serial_number)
+        coordinator = IQuaDeviceCoordinator(self.hass, self, iqua_api)
+        self.devices[device_serial_number] = coordinator
+        self.async_update_settings(device_serial_number, settings)
+        if self._unsub_fan_out is None:
+            self._unsub_fan_out = self.async_add_listener(self._async_fan_out)
+        return coordinator
+
+    @callback
+    def async_remove_device(self, device_serial_number: str) -> bool:
+        """Unregister a softener, return True when no devices are left."""
+        self.live.async_stop(device_serial_number)
+        self.devices.pop(device_serial_number, None)
+        self._settings.pop(device_serial_number, None)
+        if self._settings:
+            self._async_apply_settings()
+            return False
+
+        if self._unsub_fan_out is not None:
+            self._unsub_fan_out()
+            self._unsub_fan_out = None
+        return True
+
+    @callback
+    def async_update_settings(
+        self, device_serial_number: str, settings: PollSettings
+    ) -> None:
+        """Store the polling options of a softener."""
+        self._settings[device_serial_number] = settings
+        self._async_apply_settings()
+        if self._listeners:
+            # Apply a changed interval now instead of after the pending poll.
+            self._schedule_refresh()
+
+    @callback
+    def _async_apply_settings(self) -> None:
+        settings = PollSettings.combine(self._settings.values())
+        if self.scheduler is None:
+            self.scheduler = AdaptivePollScheduler(settings)
+        else:
+            self.scheduler.update_settings(settings)
+        self.update_interval = timedelta(seconds=self.scheduler.interval)
+
+    async def async_refresh_coalesced(self) -> None:
+        """Refresh every softener now, joining a refresh that is already running.
+
+        Concurrent callers share one in-flight fetch, which still goes through
+        the request governor of the session.
+        """
+        if self._refresh_task is None:
+            self._refresh_task = self.hass.async_create_task(
+                self._async_coalesced_refresh()
+            )
+        await asyncio.shield(self._refresh_task)
+
+    async def _async_coalesced_refresh(self) -> None:
+        try:
+            await self.async_refresh()
+        finally:
+            self._refresh_task = None
+
+    async def _async_update_data(self) -> dict[str, IquaSoftenerData]:
+        """Fetch every registered softener and pick the next interval."""
+        data: dict[str, IquaSoftenerData] = {}
+        try:
+            with self.metrics.measure("update"):
+                data = await self._async_fetch_all()
+        finally:
+            self.update_interval = self.scheduler.next_interval(
+                data, len(self.devices), self.live.active
+            )
+            _LOGGER.debug(
+                "Next poll of %s in %s", self.session.username, self.update_interval
+            )
+        return data
+
+    async def _async_fetch_all(self) -> dict[str, IquaSoftenerData]:
+        """Fetch every registered softener in one batch.
+
+        Replayed softeners run at the pace of their recording and are skipped.
+        """
+        serials = [
+            serial
+            for serial, coordinator in self.devices.items()
+            if not coordinator.replaying
+        ]
+        results = await asyncio.gather(
+            *(
+                self.devices[serial].iqua_api.async_get_data(self.devices[serial].data)
+                for serial in serials
+            ),
+            return_exceptions=True,
+        )
+
+        data: dict[str, IquaSoftenerData] = {}
+        self.errors = {}
+        for serial, result in zip(serials, results):
+            if isinstance(result, IquaSoftenerException):
+                self.errors[serial] = result
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                data[serial] = result
+
+        if serials and not data:
+            if self.session.auth_failed:
+                raise ConfigEntryAuthFailed(
+                    f"Credentials of {self.session.username} were rejected"
+                )
+            raise UpdateFailed(
+                f"Error while retreiving data: {next(iter(self.errors.values()))}"
+            )
+        return data
+
+    @callback
+    def _async_fan_out(self) -> None:
+        """Push the batch result to the device coordinators."""
+        auth_failed = not self.last_update_success and isinstance(
+            self.last_exception, ConfigEntryAuthFailed
+        )
+        with self.metrics.measure("fan_out"):
+            for serial, coordinator in self.devices.items():
+                if auth_failed and coordinator.config_entry is not None:
+                    coordinator.config_entry.async_start_reauth(self.hass)
+                if not self.last_update_success:
+                    coordinator.async_set_update_error(self.last_exception)
+                elif serial in self.errors:
+                    coordinator.async_set_update_error(
+                        UpdateFailed(
+                            f"Error while retreiving data: {self.errors[serial]}"
+                        )
+                    )
+                elif serial in self.data:
+                    coordinator.async_set_updated_data(self.data[serial])
+
+
+@callback
+def async_get_account(
+    hass: HomeAssistant, session: IquaSoftenerSession
+) -> IQuaAccountCoordinator:
+    """Return the shared account coordinator for a session."""
+    accounts: dict[str, IQuaAccountCoordinator] = hass.data.setdefault(
+        DOMAIN, {}
+    ).setdefault(DATA_ACCOUNTS, {})
+    if (account := accounts.get(session.username)) is None:
+        account = accounts[session.username] = IQuaAccountCoordinator(hass, session)
+    return account
+
+
+async def async_release_account(
+    hass: HomeAssistant, account: IQuaAccountCoordinator, device_serial_number: str
+) -> None:
+    """Drop a softener from its account and shut the account down when unused."""
+    if account.async_remove_device(device_serial_number):
+        account.live.async_stop_all()
+        await account.async_shutdown()
+        hass.data[DOMAIN][DATA_ACCOUNTS].pop(account.session.username, None)
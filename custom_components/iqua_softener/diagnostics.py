@@ -0,0 +1,70 @@
+"""Diagnostics support for IQua Water Softener."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_DEVICE_SERIAL_NUMBER, DOMAIN
+from .models import IQuaEntryData
+
+TO_REDACT = {
+    CONF_USERNAME,
+    CONF_PASSWORD,
+    CONF_DEVICE_SERIAL_NUMBER,
+    "title",
+    "unique_id",
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    entry_data: IQuaEntryData = hass.data[DOMAIN][entry.entry_id]
+    account = entry_data.account
+    coordinator = entry_data.coordinator
+    session = account.session
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "setup_duration": entry_data.setup_duration,
+        "session": {
+            "logins": session.login_count,
+            "data_requests": session.fetch_count,
+            "token_valid": session.token_valid,
+            "metrics": session.metrics.as_dict(),
+        },
+        "governor": session.governor.as_dict(),
+        "account": {
+            "devices": len(account.devices),
+            "update_interval": account.update_interval.total_seconds()
+            if account.update_interval
+            else None,
+            "last_update_success": account.last_update_success,
+            "live_updates": {
+                "connected": len(account.live.connected),
+                "messages": account.live.messages,
+                "reconnects": account.live.reconnects,
+            },
+            "metrics": account.metrics.as_dict(),
+        },
+        "device": {
+            "last_update_success": coordinator.last_update_success,
+            "is_stale": coordinator.is_stale,
+            "invalid_fields": sorted(coordinator.data.invalid_fields)
+            if coordinator.data
+            else [],
+            "written_updates": coordinator.written_updates,
+            "skipped_updates": coordinator.skipped_updates,
+            "leaks": {
+                "continuous_flow": coordinator.leaks.continuous_flow,
+                "night_usage": coordinator.leaks.night_usage,
+                "high_daily_use": coordinator.leaks.high_daily_use,
+                "night_baseline": coordinator.leaks.night_baseline,
+            },
+            "metrics": coordinator.metrics.as_dict(),
+        },
+    }
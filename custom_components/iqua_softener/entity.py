@@ -2,14 +2,17 @@
 from __future__ import annotations
 
 import logging
+from typing import Any
 
 import homeassistant.helpers.device_registry as dr
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import ATTR_ATTRIBUTION
+from homeassistant.core import callback
 from homeassistant.helpers.entity import DeviceInfo, Entity
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
-from .const import DEFAULT_ATTRIBUTION, DEFAULT_BRAND, DOMAIN
+from .const import ATTR_STALE, DEFAULT_ATTRIBUTION, DEFAULT_BRAND, DOMAIN
+from .coordinator import IQuaDeviceCoordinator
+from .models import IquaSoftenerData
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -22,11 +25,14 @@ class IQuaEntity(Entity):
     # pylint: disable=line-too-long
     # Seven is reasonable in this case.
 
+    # State is pushed by the coordinator, async_update only serves
+    # homeassistant.update_entity.
+    _attr_should_poll = False
+
     def __init__(
         self,
         iqua_api,
-        coordinator: DataUpdateCoordinator,
-        device_data,
+        coordinator: IQuaDeviceCoordinator,
         description,
         entries: ConfigEntry,
     ):
@@ -36,9 +42,8 @@ class IQuaEntity(Entity):
 
         self.iqua_api = iqua_api
         self.coordinator = coordinator
-        self.device_data = device_data
         self.entry: ConfigEntry = entries
-        self._attr_available = self.coordinator.last_update_success
+        self._published_state: tuple[Any, ...] | None = None
         self._attr_unique_id = f"{self.entry.unique_id}_{self.entity_description.key}"
         self._attr_name = f"{DEFAULT_BRAND} {self.entity_description.key}"
         self._attr_device_info = DeviceInfo(
@@ -48,15 +53,60 @@ class IQuaEntity(Entity):
             configuration_url="https://github.com/briis/homeassistant-iqua-softener",
         )
 
+    @property
+    def data(self) -> IquaSoftenerData | None:
+        """Return the latest data of the device.
+
+        Every entity property reads through here, never from a copy taken at
+        setup, so all sensors follow each coordinator update.
+        """
+        return self.coordinator.data
+
+    @property
+    def available(self) -> bool:
+        """Return True while there is data, even when the last update failed.
+
+        Evaluated on every coordinator update. A failed update keeps the last
+        data and marks it stale instead of dropping the entity.
+        """
+        return self.coordinator.data is not None
+
     @property
     def extra_state_attributes(self):
         """Return common attributes"""
+        if self.coordinator.is_stale or not self.coordinator.last_update_success:
+            return {
+                ATTR_ATTRIBUTION: DEFAULT_ATTRIBUTION,
+                ATTR_STALE: True,
+            }
         return {
             ATTR_ATTRIBUTION: DEFAULT_ATTRIBUTION,
         }
 
+    def _state_signature(self) -> tuple[Any, ...]:
+        """Return everything this entity publishes, used to detect changes."""
+        return (self.available, self.extra_state_attributes)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when something the entity publishes has changed."""
+        signature = self._state_signature()
+        if signature == self._published_state:
+            self.coordinator.skipped_updates += 1
+            return
+
+        self._published_state = signature
+        self.coordinator.written_updates += 1
+        with self.coordinator.metrics.measure("state_write"):
+            self.async_write_ha_state()
+
+    async def async_update(self) -> None:
+        """Refresh the account, shared by every entity updated at the same time."""
+        await self.coordinator.account.async_refresh_coalesced()
+
     async def async_added_to_hass(self):
         """When entity is added to hass."""
+        self._published_state = self._state_signature()
         self.async_on_remove(
-            self.coordinator.async_add_listener(self.async_write_ha_state)
+            self.coordinator.async_add_listener(self._handle_coordinator_update)
         )
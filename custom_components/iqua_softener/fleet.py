@@ -0,0 +1,201 @@
+"""Fleet wide aggregation of every IQua Water Softener."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DATA_FLEET,
+    DOMAIN,
+    LITERS_PER_GALLON,
+    IquaSoftenerState,
+    IquaSoftenerVolumeUnit,
+)
+from .models import IquaSoftenerData
+
+
+@dataclass(frozen=True)
+class FleetDevice:
+    """Contribution of one softener to the fleet statistics."""
+
+    today_use: float
+    salt_level_percent: int | None
+    offline: bool
+    out_of_salt: datetime | None
+
+
+class IQuaFleet:
+    """Aggregated statistics of every softener, updated one device at a time.
+
+    Sums and counts are adjusted by the difference of the updated device. The
+    minimum salt level and the nearest out of salt date are only searched
+    again when the device holding them moves away from the extreme.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the fleet."""
+        self._devices: dict[str, FleetDevice] = {}
+        self._listeners: list[Callable[[], None]] = []
+        self.total_today_use = 0.0
+        self.offline_devices = 0
+        self.lowest_salt_device: str | None = None
+        self.next_out_of_salt_device: str | None = None
+        # Entries opted in to the fleet sensors, the first one provides them.
+        self._sensor_providers: dict[str, Callable[[], None]] = {}
+        self.sensor_entry_id: str | None = None
+
+    @property
+    def device_count(self) -> int:
+        """Return the number of softeners in the fleet."""
+        return len(self._devices)
+
+    @property
+    def lowest_salt_level(self) -> int | None:
+        """Return the lowest salt level of the fleet."""
+        if self.lowest_salt_device is None:
+            return None
+        return self._devices[self.lowest_salt_device].salt_level_percent
+
+    @property
+    def next_out_of_salt(self) -> datetime | None:
+        """Return the nearest out of salt date of the fleet."""
+        if self.next_out_of_salt_device is None:
+            return None
+        return self._devices[self.next_out_of_salt_device].out_of_salt
+
+    @callback
+    def async_add_listener(self, update_callback: Callable[[], None]) -> CALLBACK_TYPE:
+        """Listen for changes of the fleet statistics."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_add_sensor_provider(
+        self, entry_id: str, add_sensors: Callable[[], None]
+    ) -> CALLBACK_TYPE:
+        """Offer an entry to provide the shared fleet sensors.
+
+        The sensors are added through the first entry offered. When that entry
+        is removed again they are handed over to the next one still offered.
+        """
+        self._sensor_providers[entry_id] = add_sensors
+        if self.sensor_entry_id is None:
+            self._async_hand_over_sensors()
+
+        @callback
+        def remove_provider() -> None:
+            self._sensor_providers.pop(entry_id, None)
+            if self.sensor_entry_id == entry_id:
+                self._async_hand_over_sensors()
+
+        return remove_provider
+
+    @callback
+    def _async_hand_over_sensors(self) -> None:
+        self.sensor_entry_id = next(iter(self._sensor_providers), None)
+        if self.sensor_entry_id is not None:
+            self._sensor_providers[self.sensor_entry_id]()
+
+    @callback
+    def async_update_device(self, serial: str, data: IquaSoftenerData | None) -> None:
+        """Apply the latest data of a softener."""
+        if data is None:
+            return
+        today_use = float(data.today_use or 0)
+        if data.volume_unit != IquaSoftenerVolumeUnit.LITERS:
+            today_use *= LITERS_PER_GALLON
+        out_of_salt = None
+        if data.out_of_salt_estimated_days is not None:
+            out_of_salt = dt_util.start_of_local_day() + timedelta(
+                days=data.out_of_salt_estimated_days
+            )
+        self._async_set(
+            serial,
+            FleetDevice(
+                today_use=today_use,
+                salt_level_percent=data.salt_level_percent,
+                offline=data.state == IquaSoftenerState.OFFLINE,
+                out_of_salt=out_of_salt,
+            ),
+        )
+
+    @callback
+    def async_remove_device(self, serial: str) -> None:
+        """Drop a softener from the fleet."""
+        self._async_set(serial, None)
+
+    @callback
+    def _async_set(self, serial: str, device: FleetDevice | None) -> None:
+        previous = self._devices.pop(serial, None)
+        if previous == device:
+            if device is not None:
+                self._devices[serial] = device
+            return
+
+        if previous is not None:
+            self.total_today_use -= previous.today_use
+            self.offline_devices -= previous.offline
+        if device is not None:
+            self._devices[serial] = device
+            self.total_today_use += device.today_use
+            self.offline_devices += device.offline
+
+        self._async_update_lowest_salt(serial, device)
+        self._async_update_next_out_of_salt(serial, device)
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def _async_update_lowest_salt(
+        self, serial: str, device: FleetDevice | None
+    ) -> None:
+        level = device.salt_level_percent if device is not None else None
+        if level is not None and (
+            self.lowest_salt_level is None or level < self.lowest_salt_level
+        ):
+            self.lowest_salt_device = serial
+        elif serial == self.lowest_salt_device:
+            self.lowest_salt_device = min(
+                (
+                    item_serial
+                    for item_serial, item in self._devices.items()
+                    if item.salt_level_percent is not None
+                ),
+                key=lambda item_serial: self._devices[item_serial].salt_level_percent,
+                default=None,
+            )
+
+    @callback
+    def _async_update_next_out_of_salt(
+        self, serial: str, device: FleetDevice | None
+    ) -> None:
+        out_of_salt = device.out_of_salt if device is not None else None
+        if out_of_salt is not None and (
+            self.next_out_of_salt is None or out_of_salt < self.next_out_of_salt
+        ):
+            self.next_out_of_salt_device = serial
+        elif serial == self.next_out_of_salt_device:
+            self.next_out_of_salt_device = min(
+                (
+                    item_serial
+                    for item_serial, item in self._devices.items()
+                    if item.out_of_salt is not None
+                ),
+                key=lambda item_serial: self._devices[item_serial].out_of_salt,
+                default=None,
+            )
+
+
+@callback
+def async_get_fleet(hass: HomeAssistant) -> IQuaFleet:
+    """Return the fleet of every configured softener."""
+    return hass.data.setdefault(DOMAIN, {}).setdefault(DATA_FLEET, IQuaFleet())
@@ -0,0 +1,123 @@
+"""Salt and regeneration forecasting for IQua Water Softener."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .history import HistoryRecord
+
+# Weight of the newest regeneration in the running averages.
+SMOOTHING = 0.3
+# A salt level rise larger than this is a refill, not measurement noise.
+REFILL_THRESHOLD = 10
+
+
+def _smooth(average: float | None, value: float) -> float:
+    if average is None:
+        return value
+    return average + SMOOTHING * (value - average)
+
+
+class SaltForecaster:
+    """Learns salt use and regeneration rhythm from the history of a device.
+
+    Each sample updates exponentially weighted averages in constant time. A
+    regeneration is detected when days_since_last_regeneration goes down.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the forecaster."""
+        self.salt_per_regeneration: float | None = None
+        self.days_per_regeneration: float | None = None
+        self.water_per_regeneration: float | None = None
+        self.regenerations = 0
+        self._last: HistoryRecord | None = None
+        self._salt_at_regeneration: int | None = None
+        self._water_since_regeneration = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the learned state, without the last sample, for storage."""
+        return {
+            "salt_per_regeneration": self.salt_per_regeneration,
+            "days_per_regeneration": self.days_per_regeneration,
+            "water_per_regeneration": self.water_per_regeneration,
+            "regenerations": self.regenerations,
+            "salt_at_regeneration": self._salt_at_regeneration,
+            "water_since_regeneration": self._water_since_regeneration,
+        }
+
+    def restore(self, stored: dict[str, Any], last: HistoryRecord | None) -> None:
+        """Continue from a stored state whose last sample was last."""
+        self.salt_per_regeneration = stored["salt_per_regeneration"]
+        self.days_per_regeneration = stored["days_per_regeneration"]
+        self.water_per_regeneration = stored["water_per_regeneration"]
+        self.regenerations = stored["regenerations"]
+        self._salt_at_regeneration = stored["salt_at_regeneration"]
+        self._water_since_regeneration = stored["water_since_regeneration"]
+        self._last = last
+
+    def add(self, record: HistoryRecord, usage: float) -> None:
+        """Learn from a new sample and the water used since the previous one."""
+        last, self._last = self._last, record
+        salt = record.salt_level_percent
+        if last is None:
+            self._salt_at_regeneration = salt
+            return
+
+        self._water_since_regeneration += usage
+
+        if salt is not None and (
+            self._salt_at_regeneration is None
+            or salt > self._salt_at_regeneration + REFILL_THRESHOLD
+        ):
+            self._salt_at_regeneration = salt
+
+        if record.days_since_last_regeneration >= last.days_since_last_regeneration:
+            return
+
+        self.regenerations += 1
+        self.days_per_regeneration = _smooth(
+            self.days_per_regeneration,
+            last.days_since_last_regeneration + 1 - record.days_since_last_regeneration,
+        )
+        self.water_per_regeneration = _smooth(
+            self.water_per_regeneration, self._water_since_regeneration
+        )
+        if (
+            salt is not None
+            and self._salt_at_regeneration is not None
+            and salt <= self._salt_at_regeneration
+        ):
+            self.salt_per_regeneration = _smooth(
+                self.salt_per_regeneration, self._salt_at_regeneration - salt
+            )
+        self._salt_at_regeneration = salt
+        self._water_since_regeneration = 0.0
+
+    def days_until_regeneration(self) -> float | None:
+        """Return the expected number of days until the next regeneration."""
+        if (record := self._last) is None:
+            return None
+        if record.average_daily_use > 0 and record.total_water_available > 0:
+            return record.total_water_available / record.average_daily_use
+        if self.days_per_regeneration is None:
+            return None
+        return max(
+            0.0, self.days_per_regeneration - record.days_since_last_regeneration
+        )
+
+    def days_until_out_of_salt(self) -> float | None:
+        """Return the expected number of days until the salt runs out."""
+        if (
+            (record := self._last) is None
+            or record.salt_level_percent is None
+            or not self.salt_per_regeneration
+            or self.days_per_regeneration is None
+        ):
+            return None
+        regenerations_left = record.salt_level_percent / self.salt_per_regeneration
+        return max(
+            0.0,
+            regenerations_left * self.days_per_regeneration
+            - record.days_since_last_regeneration,
+        )
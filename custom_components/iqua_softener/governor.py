@@ -0,0 +1,163 @@
+"""Request governor for calls to the iQua cloud."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from .models import IquaSoftenerException
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+DEFAULT_RATE = 2.0
+DEFAULT_BURST = 20
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 2.0
+DEFAULT_BACKOFF_MAX = 60.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN = 300.0
+
+
+class IquaSoftenerCircuitOpenError(IquaSoftenerException):
+    """Raised while the governor refuses to call the cloud."""
+
+
+class RequestGovernor:
+    """Rate limit, retry and circuit breaker shared by every call of an account.
+
+    Calls take a token from a token bucket before they run. Failures of the
+    retryable types are retried with full jitter exponential back-off, or after
+    the server's Retry-After when given. After repeated calls that failed
+    every retry the circuit opens and calls fail fast until the cooldown has passed, after which one
+    call is let through to probe the cloud.
+    """
+
+    def __init__(
+        self,
+        retryable: tuple[type[Exception], ...],
+        rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        cooldown: float = DEFAULT_COOLDOWN,
+    ) -> None:
+        """Initialize the governor."""
+        self._retryable = retryable
+        self._rate = rate
+        self._burst = burst
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._consecutive_failures = 0
+
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.circuit_opened = 0
+
+    @property
+    def circuit_open(self) -> bool:
+        """Return True while calls are refused."""
+        return time.monotonic() < self._blocked_until
+
+    async def async_call(
+        self, func: Callable[..., Awaitable[_T]], *args: Any, **kwargs: Any
+    ) -> _T:
+        """Run a cloud call under the rate limit, retry and circuit breaker rules."""
+        attempt = 0
+        while True:
+            if (remaining := self._blocked_until - time.monotonic()) > 0:
+                self.rejected += 1
+                raise IquaSoftenerCircuitOpenError(
+                    f"Cloud calls paused for another {remaining:.0f} seconds"
+                )
+
+            await self._async_take_token()
+            self.calls += 1
+            try:
+                result = await func(*args, **kwargs)
+            except self._retryable as err:
+                retry_after: float | None = getattr(err, "retry_after", None)
+                if attempt >= self._max_retries or (
+                    retry_after is not None and retry_after > self._backoff_max
+                ):
+                    # Only calls that gave up count towards the circuit breaker,
+                    # so a blip hitting several concurrent calls does not open it.
+                    self._consecutive_failures += 1
+                    if self._consecutive_failures >= self._failure_threshold:
+                        self._open_circuit(max(self._cooldown, retry_after or 0))
+                    elif retry_after is not None:
+                        self._blocked_until = time.monotonic() + retry_after
+                    raise
+
+                delay = (
+                    retry_after
+                    if retry_after is not None
+                    else random.uniform(
+                        0, min(self._backoff_max, self._backoff_base * 2**attempt)
+                    )
+                )
+                attempt += 1
+                self.retries += 1
+                _LOGGER.debug("Retrying cloud call in %.1f seconds: %s", delay, err)
+                await asyncio.sleep(delay)
+            else:
+                self._consecutive_failures = 0
+                return result
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the governor state for diagnostics."""
+        self._refill()
+        return {
+            "tokens": round(self._tokens, 2),
+            "rate": self._rate,
+            "burst": self._burst,
+            "circuit_open": self.circuit_open,
+            "blocked_for": max(0.0, round(self._blocked_until - time.monotonic(), 1)),
+            "consecutive_failures": self._consecutive_failures,
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "circuit_opened": self.circuit_opened,
+        }
+
+    def _open_circuit(self, duration: float) -> None:
+        _LOGGER.warning(
+            "Pausing iQua cloud calls for %.0f seconds after %s failures",
+            duration,
+            self._consecutive_failures,
+        )
+        self.circuit_opened += 1
+        self._blocked_until = time.monotonic() + duration
+        # Let a single probe through once the cooldown is over.
+        self._consecutive_failures = self._failure_threshold - 1
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._refilled_at) * self._rate
+        )
+        self._refilled_at = now
+
+    async def _async_take_token(self) -> None:
+        self._refill()
+        while self._tokens < 1:
+            self.throttled += 1
+            await asyncio.sleep((1 - self._tokens) / self._rate)
+            self._refill()
+        self._tokens -= 1
@@ -0,0 +1,372 @@
+"""Local usage history and long-term statistics for IQua Water Softener."""
+from __future__ import annotations
+
+import logging
+import os
+import struct
+import threading
+from collections import deque
+from collections.abc import Iterator
+from dataclasses import astuple, dataclass
+from typing import Any
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.const import PERCENTAGE, UnitOfVolume
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import STORAGE_DIR, Store
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import DOMAIN, STORAGE_SAVE_DELAY, STORAGE_VERSION, IquaSoftenerVolumeUnit
+from .forecast import SaltForecaster
+from .models import IquaSoftenerData, water_used
+
+_LOGGER = logging.getLogger(__name__)
+
+# timestamp, today_use, current_water_flow, total_water_available,
+# average_daily_use, salt_level_percent (255 when unknown),
+# days_since_last_regeneration, volume_unit
+RECORD = struct.Struct("<IffffBHB")
+NO_SALT_LEVEL = 255
+
+HOURLY_BUCKETS = 24 * 31
+# About a year of polls every 30 seconds, roughly 25 MB per device.
+MAX_RECORDS = 1_000_000
+COMPACTED_RECORDS = 750_000
+
+
+@dataclass(frozen=True)
+class HistoryRecord:
+    """A single poll as stored in the history file."""
+
+    timestamp: int
+    today_use: float
+    current_water_flow: float
+    total_water_available: float
+    average_daily_use: float
+    salt_level_percent: int | None
+    days_since_last_regeneration: int
+    volume_unit: int
+
+    @classmethod
+    def from_data(cls, timestamp: int, data: IquaSoftenerData) -> HistoryRecord:
+        """Build a record from a coordinator payload."""
+        return cls(
+            timestamp=timestamp,
+            today_use=float(data.today_use or 0),
+            current_water_flow=float(data.current_water_flow or 0),
+            total_water_available=float(data.total_water_available or 0),
+            average_daily_use=float(data.average_daily_use or 0),
+            salt_level_percent=data.salt_level_percent,
+            days_since_last_regeneration=int(data.days_since_last_regeneration or 0),
+            volume_unit=int(data.volume_unit or 0),
+        )
+
+    def pack(self) -> bytes:
+        """Return the fixed width binary form of the record."""
+        return RECORD.pack(
+            self.timestamp,
+            self.today_use,
+            self.current_water_flow,
+            self.total_water_available,
+            self.average_daily_use,
+            NO_SALT_LEVEL
+            if self.salt_level_percent is None
+            else min(max(int(self.salt_level_percent), 0), 254),
+            min(max(self.days_since_last_regeneration, 0), 0xFFFF),
+            self.volume_unit,
+        )
+
+    @classmethod
+    def unpack(cls, values: tuple) -> HistoryRecord:
+        """Build a record from unpacked binary values."""
+        fields = list(values)
+        if fields[5] == NO_SALT_LEVEL:
+            fields[5] = None
+        return cls(*fields)
+
+
+@dataclass
+class UsageBucket:
+    """Usage rolled up over an hour."""
+
+    start: int
+    usage: float = 0.0
+    samples: int = 0
+    max_flow: float = 0.0
+    salt_min: int | None = None
+    salt_max: int | None = None
+    salt_total: int = 0
+    salt_samples: int = 0
+
+    def add(self, usage: float, record: HistoryRecord) -> None:
+        """Add a poll to the bucket."""
+        self.usage += usage
+        self.samples += 1
+        self.max_flow = max(self.max_flow, record.current_water_flow)
+        if (salt := record.salt_level_percent) is not None:
+            self.salt_min = salt if self.salt_min is None else min(self.salt_min, salt)
+            self.salt_max = salt if self.salt_max is None else max(self.salt_max, salt)
+            self.salt_total += salt
+            self.salt_samples += 1
+
+    @property
+    def salt_mean(self) -> float | None:
+        """Return the mean salt level of the bucket."""
+        if not self.salt_samples:
+            return None
+        return self.salt_total / self.salt_samples
+
+
+class IQuaHistory:
+    """Append-only per device history with hourly roll-ups.
+
+    Every poll is appended as a fixed width record and each closed hour is
+    imported into the long-term statistics as external statistics. The
+    roll-ups and the salt forecaster are kept in memory and checkpointed to a
+    store, so startup only replays the records written after the checkpoint.
+    Once the file holds MAX_RECORDS records it is compacted to the newest
+    COMPACTED_RECORDS.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, device_serial_number: str, persistent: bool = True
+    ) -> None:
+        """Initialize the history.
+
+        A history that is not persistent only keeps the roll-ups in memory and
+        neither touches the file nor the long-term statistics.
+        """
+        self.hass = hass
+        self.persistent = persistent
+        slug = slugify(device_serial_number)
+        self._path = hass.config.path(STORAGE_DIR, f"{DOMAIN}.history", f"{slug}.bin")
+        self._checkpoint: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.history.{slug}"
+        )
+        self._usage_statistic_id = f"{DOMAIN}:{slug}_water_usage"
+        self._salt_statistic_id = f"{DOMAIN}:{slug}_salt_level"
+        self._name = device_serial_number
+        # Appends and compactions run in the executor, one at a time. Records
+        # are queued in poll order, as executor jobs may run in any order.
+        self._file_lock = threading.Lock()
+        self._pending: deque[bytes] = deque()
+        self._records = 0
+
+        self.hourly: deque[UsageBucket] = deque(maxlen=HOURLY_BUCKETS)
+        self.total_usage = 0.0
+        self.last_record: HistoryRecord | None = None
+        self._last_today_use: float | None = None
+        self.forecaster = SaltForecaster()
+        self._volume_unit = IquaSoftenerVolumeUnit.GALLONS
+
+    @property
+    def path(self) -> str:
+        """Return the path of the history file."""
+        return self._path
+
+    async def async_load(self) -> None:
+        """Restore the checkpoint and replay the records written after it."""
+        after: int | None = None
+        if (stored := await self._checkpoint.async_load()) is not None:
+            try:
+                self._restore(stored)
+            except (KeyError, TypeError, ValueError) as err:
+                _LOGGER.debug("Ignoring invalid history checkpoint: %s", err)
+            else:
+                after = self.last_record.timestamp if self.last_record else None
+        self._records, records = await self.hass.async_add_executor_job(
+            self._read_records, after
+        )
+        for record in records:
+            self._async_roll_up(record)
+        _LOGGER.debug(
+            "Replayed %s of %s history records for %s",
+            len(records),
+            self._records,
+            self._name,
+        )
+
+    @callback
+    def async_add(self, data: IquaSoftenerData) -> None:
+        """Append a poll to the history and import any closed hour."""
+        record = HistoryRecord.from_data(int(data.timestamp.timestamp()), data)
+        last = self.last_record
+        if last is not None and record.timestamp <= last.timestamp:
+            return
+
+        closed = self.hourly[-1] if self.hourly else None
+        self._async_roll_up(record)
+        if not self.persistent:
+            return
+        self._records += 1
+        compact = self._records >= MAX_RECORDS
+        if compact:
+            self._records = COMPACTED_RECORDS
+        self._pending.append(record.pack())
+        self.hass.async_add_executor_job(self._write_pending, compact)
+        self._checkpoint.async_delay_save(self._checkpoint_data, STORAGE_SAVE_DELAY)
+        if closed is not None and closed is not self.hourly[-1]:
+            self._async_import_statistics(closed)
+
+    def iter_records(
+        self, chunk_size: int = 1024, start: int = 0
+    ) -> Iterator[HistoryRecord]:
+        """Yield the stored records from index start, reading the file in chunks.
+
+        Runs in the executor.
+        """
+        if not os.path.exists(self._path):
+            return
+        with open(self._path, "rb") as history_file:
+            history_file.seek(start * RECORD.size)
+            while chunk := history_file.read(RECORD.size * chunk_size):
+                usable = len(chunk) - len(chunk) % RECORD.size
+                for values in RECORD.iter_unpack(chunk[:usable]):
+                    yield HistoryRecord.unpack(values)
+
+    async def async_remove(self) -> None:
+        """Delete the history file and its checkpoint."""
+        await self.hass.async_add_executor_job(self._remove)
+        await self._checkpoint.async_remove()
+
+    def _remove(self) -> None:
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+    def _restore(self, stored: dict[str, Any]) -> None:
+        last = stored["last_record"]
+        last_record = None if last is None else HistoryRecord(*last)
+        hourly = [UsageBucket(*bucket) for bucket in stored["hourly"]]
+        volume_unit = IquaSoftenerVolumeUnit(stored["volume_unit"])
+        forecaster = SaltForecaster()
+        forecaster.restore(stored["forecaster"], last_record)
+
+        self.last_record = last_record
+        self._last_today_use = stored.get(
+            "last_today_use", None if last_record is None else last_record.today_use
+        )
+        self.total_usage = float(stored["total_usage"])
+        self._volume_unit = volume_unit
+        self.hourly.extend(hourly)
+        self.forecaster = forecaster
+
+    def _checkpoint_data(self) -> dict[str, Any]:
+        return {
+            "last_record": None
+            if self.last_record is None
+            else astuple(self.last_record),
+            "last_today_use": self._last_today_use,
+            "total_usage": self.total_usage,
+            "volume_unit": int(self._volume_unit),
+            "hourly": [astuple(bucket) for bucket in self.hourly],
+            "forecaster": self.forecaster.as_dict(),
+        }
+
+    def _read_records(self, after: int | None) -> tuple[int, list[HistoryRecord]]:
+        """Return the number of records and those newer than after."""
+        if not os.path.exists(self._path):
+            return 0, []
+        count = os.path.getsize(self._path) // RECORD.size
+        start = 0
+        if after is not None:
+            # Records are appended in time order, find the first newer one.
+            end = count
+            with open(self._path, "rb") as history_file:
+                while start < end:
+                    middle = (start + end) // 2
+                    history_file.seek(middle * RECORD.size)
+                    if RECORD.unpack(history_file.read(RECORD.size))[0] <= after:
+                        start = middle + 1
+                    else:
+                        end = middle
+        return count, list(self.iter_records(start=start))
+
+    def _write_pending(self, compact: bool) -> None:
+        with self._file_lock:
+            packed = b"".join(
+                self._pending.popleft() for _ in range(len(self._pending))
+            )
+            if packed:
+                os.makedirs(os.path.dirname(self._path), exist_ok=True)
+                with open(self._path, "ab") as history_file:
+                    history_file.write(packed)
+            if compact:
+                self._compact()
+
+    def _compact(self) -> None:
+        """Keep only the newest COMPACTED_RECORDS records."""
+        size = os.path.getsize(self._path)
+        with open(self._path, "rb") as history_file:
+            history_file.seek(max(0, size - COMPACTED_RECORDS * RECORD.size))
+            kept = history_file.read()
+        compacted = f"{self._path}.tmp"
+        with open(compacted, "wb") as history_file:
+            history_file.write(kept)
+        os.replace(compacted, self._path)
+        _LOGGER.debug("Compacted the history of %s", self._name)
+
+    @callback
+    def _async_roll_up(self, record: HistoryRecord) -> None:
+        usage, self._last_today_use = water_used(self._last_today_use, record.today_use)
+        self.last_record = record
+        self.total_usage += usage
+        self.forecaster.add(record, usage)
+        self._volume_unit = IquaSoftenerVolumeUnit(record.volume_unit)
+
+        moment = dt_util.utc_from_timestamp(record.timestamp)
+        hour = int(moment.replace(minute=0, second=0, microsecond=0).timestamp())
+        if not self.hourly or self.hourly[-1].start != hour:
+            self.hourly.append(UsageBucket(hour))
+        self.hourly[-1].add(usage, record)
+
+    @callback
+    def _async_import_statistics(self, bucket: UsageBucket) -> None:
+        """Import a closed hour into the long-term statistics."""
+        start = dt_util.utc_from_timestamp(bucket.start)
+        total = self.total_usage - self._usage_since(bucket.start)
+        async_add_external_statistics(
+            self.hass,
+            StatisticMetaData(
+                has_mean=False,
+                has_sum=True,
+                name=f"IQua {self._name} water usage",
+                source=DOMAIN,
+                statistic_id=self._usage_statistic_id,
+                unit_of_measurement=UnitOfVolume.LITERS
+                if self._volume_unit == IquaSoftenerVolumeUnit.LITERS
+                else UnitOfVolume.GALLONS,
+            ),
+            [StatisticData(start=start, state=total, sum=total)],
+        )
+
+        if bucket.salt_mean is None:
+            return
+        async_add_external_statistics(
+            self.hass,
+            StatisticMetaData(
+                has_mean=True,
+                has_sum=False,
+                name=f"IQua {self._name} salt level",
+                source=DOMAIN,
+                statistic_id=self._salt_statistic_id,
+                unit_of_measurement=PERCENTAGE,
+            ),
+            [
+                StatisticData(
+                    start=start,
+                    mean=bucket.salt_mean,
+                    min=bucket.salt_min,
+                    max=bucket.salt_max,
+                )
+            ],
+        )
+
+    def _usage_since(self, hour: int) -> float:
+        """Return the usage recorded after the given hour bucket."""
+        usage = 0.0
+        for bucket in reversed(self.hourly):
+            if bucket.start <= hour:
+                break
+            usage += bucket.usage
+        return usage
@@ -0,0 +1,94 @@
+"""Local leak detection for IQua Water Softener."""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DEFAULT_LEAK_FLOW_MINUTES,
+    LITERS_PER_GALLON,
+    IquaSoftenerVolumeUnit,
+)
+from .models import IquaSoftenerData, water_used
+
+# Local hours in which water use counts as night use.
+NIGHT_START = 1
+NIGHT_END = 5
+# Night use above this multiple of the usual night use is suspicious.
+NIGHT_FACTOR = 3.0
+# Night use below this many liters is never reported.
+NIGHT_MIN_LITERS = 10.0
+# Weight of the newest night in the usual night use.
+NIGHT_SMOOTHING = 0.2
+# Daily use above this multiple of the daily average is suspicious.
+DAILY_FACTOR = 2.5
+
+
+class LeakDetector:
+    """Watches the flow and usage of a softener for signs of a leak.
+
+    Each sample updates a few counters in constant time, so the detector can
+    run on every poll and every live update.
+    """
+
+    def __init__(self, flow_minutes: int = DEFAULT_LEAK_FLOW_MINUTES) -> None:
+        """Initialize the detector."""
+        self.flow_duration = timedelta(minutes=flow_minutes)
+        self.continuous_flow = False
+        self.night_usage = False
+        self.high_daily_use = False
+        self.flow_since: datetime | None = None
+        self.night_use = 0.0
+        self.night_baseline: float | None = None
+        self._night: date | None = None
+        self._last_today_use: float | None = None
+
+    def add(self, data: IquaSoftenerData) -> None:
+        """Learn from a new sample, taken at data.timestamp, and update the flags."""
+        self._add_flow(data, data.timestamp)
+        self._add_night_use(data, data.timestamp)
+        average = data.average_daily_use or 0
+        self.high_daily_use = (
+            average > 0 and (data.today_use or 0) > average * DAILY_FACTOR
+        )
+
+    def _add_flow(self, data: IquaSoftenerData, now: datetime) -> None:
+        if not data.current_water_flow:
+            self.flow_since = None
+        elif self.flow_since is None:
+            self.flow_since = now
+        self.continuous_flow = (
+            self.flow_since is not None and now - self.flow_since >= self.flow_duration
+        )
+
+    def _add_night_use(self, data: IquaSoftenerData, now: datetime) -> None:
+        if data.today_use is None:
+            return
+        used, self._last_today_use = water_used(
+            self._last_today_use, float(data.today_use)
+        )
+        if data.volume_unit == IquaSoftenerVolumeUnit.GALLONS:
+            used *= LITERS_PER_GALLON
+
+        local = dt_util.as_local(now)
+        if NIGHT_START <= local.hour < NIGHT_END:
+            if self._night != local.date():
+                self._night = local.date()
+                self.night_use = 0.0
+            self.night_use += used
+        elif self._night is not None:
+            self._night = None
+            if self.night_baseline is None:
+                self.night_baseline = self.night_use
+            else:
+                self.night_baseline += NIGHT_SMOOTHING * (
+                    self.night_use - self.night_baseline
+                )
+
+        self.night_usage = (
+            self._night is not None
+            and self.night_baseline is not None
+            and self.night_use
+            > max(NIGHT_MIN_LITERS, self.night_baseline * NIGHT_FACTOR)
+        )
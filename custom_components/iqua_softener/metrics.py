@@ -0,0 +1,102 @@
+"""Performance instrumentation for IQua Water Softener."""
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+# Upper bounds in seconds of the latency histogram buckets.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class LatencyHistogram:
+    """Fixed bucket latency histogram."""
+
+    def __init__(self) -> None:
+        """Initialize the histogram."""
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Add a measurement."""
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram for diagnostics."""
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4) if self.count else None,
+            "max": round(self.max, 4),
+            "last": round(self.last, 4),
+            "buckets": {
+                **{
+                    f"<={bound}": count
+                    for bound, count in zip(LATENCY_BUCKETS, self.buckets)
+                },
+                "inf": self.buckets[-1],
+            },
+        }
+
+
+class IQuaMetrics:
+    """Latency histograms and counters of one stage owner."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.latency: dict[str, LatencyHistogram] = {}
+        self.counters: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        self.last_success: datetime | None = None
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """Time a stage and count the exceptions raised from it."""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as err:
+            self.errors[f"{stage}.{type(err).__name__}"] += 1
+            raise
+        finally:
+            self.latency.setdefault(stage, LatencyHistogram()).record(
+                time.perf_counter() - started
+            )
+            self.counters[stage] += 1
+
+    def mark_success(self) -> None:
+        """Remember the time of the last successful update."""
+        self.last_success = dt_util.utcnow()
+
+    @property
+    def error_count(self) -> int:
+        """Return the total number of errors."""
+        return sum(self.errors.values())
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics for diagnostics."""
+        return {
+            "latency": {stage: item.as_dict() for stage, item in self.latency.items()},
+            "counters": dict(self.counters),
+            "errors": dict(self.errors),
+            "last_success": self.last_success.isoformat()
+            if self.last_success
+            else None,
+            "last_success_age": round(
+                (dt_util.utcnow() - self.last_success).total_seconds(), 1
+            )
+            if self.last_success
+            else None,
+        }
@@ -1,19 +1,75 @@
 """The IQua Water Softener integration models."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
 
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-from iqua_softener import (
-    IquaSoftener,
-    IquaSoftenerData,
-)
+from .const import IquaSoftenerState, IquaSoftenerVolumeUnit
+
+if TYPE_CHECKING:
+    from .api import IquaSoftenerApi
+    from .coordinator import IQuaAccountCoordinator, IQuaDeviceCoordinator
+    from .replay import IquaSoftenerReplayApi
+
+# today_use restarts from zero at midnight. A reading that dropped to at most
+# this fraction of the previous one starts a new day, a smaller drop is a late
+# reading, for example a poll answered before a live update it arrived after.
+DAY_RESET_FRACTION = 0.5
+
+
+class IquaSoftenerException(Exception):
+    """Base error of the IQua Water Softener integration."""
+
+
+def water_used(previous: float | None, today_use: float) -> tuple[float, float]:
+    """Return the water used since the previous today_use and the new reference.
+
+    A late reading uses no water and keeps the previous reading as reference,
+    so the water is not counted again when the next reading catches up.
+    """
+    if previous is None:
+        return 0.0, today_use
+    if today_use >= previous:
+        return today_use - previous, today_use
+    if today_use <= previous * DAY_RESET_FRACTION:
+        return today_use, today_use
+    return 0.0, previous
+
+
+@dataclass(frozen=True)
+class IquaSoftenerData:
+    """State of a softener as reported by the iQua cloud.
+
+    Fields listed in invalid_fields failed validation in the latest payload
+    and still hold their last valid value, or None when there was none.
+    """
+
+    timestamp: datetime
+    model: str
+    software_version: str
+    state: IquaSoftenerState
+    device_date_time: datetime
+    volume_unit: IquaSoftenerVolumeUnit
+    current_water_flow: float
+    today_use: int
+    average_daily_use: int
+    total_water_available: int
+    days_since_last_regeneration: int
+    salt_level: float
+    salt_level_percent: int
+    out_of_salt_estimated_days: int
+    hardness_grains: int
+    water_shutoff_valve_state: int
+    invalid_fields: frozenset[str] = frozenset()
 
 
 @dataclass
 class IQuaEntryData:
     """Data for the weatherbit integration."""
 
-    iqua_api: IquaSoftener
-    coordinator: DataUpdateCoordinator
-    device_data: IquaSoftenerData
+    account: IQuaAccountCoordinator
+    coordinator: IQuaDeviceCoordinator
+    iqua_api: IquaSoftenerApi | IquaSoftenerReplayApi
+    setup_duration: float | None = None
+    reload_options: dict[str, Any] = field(default_factory=dict)
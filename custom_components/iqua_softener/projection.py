@@ -0,0 +1,205 @@
+"""Projection of IquaSoftenerData into sensor values for IQua Water Softener."""
+from __future__ import annotations
+
+from collections.abc import Callable, Collection, Mapping
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.const import UnitOfVolume
+from homeassistant.helpers.typing import StateType
+
+from .const import (
+    VOLUME_FLOW_RATE_GALLONS_PER_MINUTE,
+    VOLUME_FLOW_RATE_LITERS_PER_MINUTE,
+    IquaSoftenerVolumeUnit,
+)
+from .forecast import SaltForecaster
+from .models import IquaSoftenerData
+
+
+@dataclass(frozen=True)
+class SensorProjection:
+    """Precomputed state of one sensor for one coordinator update."""
+
+    value: StateType | datetime
+    unit: str | None = None
+    icon: str | None = None
+    last_reset: datetime | None = None
+    attributes: dict[str, Any] | None = None
+
+
+ProjectionFunction = Callable[[IquaSoftenerData, datetime], SensorProjection]
+
+
+def _is_liters(data: IquaSoftenerData) -> bool:
+    return data.volume_unit == IquaSoftenerVolumeUnit.LITERS
+
+
+def _volume_unit(data: IquaSoftenerData) -> str:
+    return UnitOfVolume.LITERS if _is_liters(data) else UnitOfVolume.GALLONS
+
+
+def _project_volume(key: str) -> ProjectionFunction:
+    def project(data: IquaSoftenerData, today: datetime) -> SensorProjection:
+        return SensorProjection(getattr(data, key), unit=_volume_unit(data))
+
+    return project
+
+
+def _project_state(data: IquaSoftenerData, today: datetime) -> SensorProjection:
+    return SensorProjection(str(data.state.value))
+
+
+def _project_last_regeneration(
+    data: IquaSoftenerData, today: datetime
+) -> SensorProjection:
+    return SensorProjection(today - timedelta(days=data.days_since_last_regeneration))
+
+
+def _project_out_of_salt(data: IquaSoftenerData, today: datetime) -> SensorProjection:
+    return SensorProjection(today + timedelta(days=data.out_of_salt_estimated_days))
+
+
+def _project_salt_level(data: IquaSoftenerData, today: datetime) -> SensorProjection:
+    level = data.salt_level_percent
+    level_icon = "mdi:signal-off"
+    if level > 75:
+        level_icon = "mdi:signal-cellular-3"
+    elif level > 50:
+        level_icon = "mdi:signal-cellular-2"
+    elif level > 25:
+        level_icon = "mdi:signal-cellular-1"
+    elif level > 5:
+        level_icon = "mdi:signal-cellular-outline"
+
+    icon_color = "#9C27B0"
+    if level == 100:
+        icon_color = "#4CAF50"
+    elif level == 80:
+        icon_color = "#8BC34B"
+    elif level == 60:
+        icon_color = "#FF9800"
+    elif level == 40:
+        icon_color = "#F44336"
+
+    return SensorProjection(
+        level, icon=level_icon, attributes={"icon_color": icon_color}
+    )
+
+
+def _project_total_water_available(
+    data: IquaSoftenerData, today: datetime
+) -> SensorProjection:
+    days = data.days_since_last_regeneration
+    return SensorProjection(
+        data.total_water_available,
+        unit=_volume_unit(data),
+        last_reset=None if days is None else today - timedelta(days=days),
+    )
+
+
+def _project_current_water_flow(
+    data: IquaSoftenerData, today: datetime
+) -> SensorProjection:
+    return SensorProjection(
+        data.current_water_flow,
+        unit=VOLUME_FLOW_RATE_LITERS_PER_MINUTE
+        if _is_liters(data)
+        else VOLUME_FLOW_RATE_GALLONS_PER_MINUTE,
+    )
+
+
+def _project_today_consumption(
+    data: IquaSoftenerData, today: datetime
+) -> SensorProjection:
+    if _is_liters(data):
+        return SensorProjection(data.today_use * 0.001, unit=UnitOfVolume.CUBIC_METERS)
+    return SensorProjection(data.today_use * 0.0353146667, unit=UnitOfVolume.CUBIC_FEET)
+
+
+SENSOR_PROJECTIONS: dict[str, ProjectionFunction] = {
+    "state": _project_state,
+    "days_since_last_regeneration": _project_last_regeneration,
+    "out_of_salt_estimated_days": _project_out_of_salt,
+    "salt_level_percent": _project_salt_level,
+    "total_water_available": _project_total_water_available,
+    "current_water_flow": _project_current_water_flow,
+    "today_use": _project_volume("today_use"),
+    "today_consumption": _project_today_consumption,
+    "average_daily_use": _project_volume("average_daily_use"),
+}
+
+
+# IquaSoftenerData field each projected sensor is read from.
+SENSOR_FIELDS = {
+    **{key: key for key in SENSOR_PROJECTIONS},
+    "today_consumption": "today_use",
+}
+
+
+def _days_from_today(today: datetime, days: float | None) -> datetime | None:
+    if days is None:
+        return None
+    return today + timedelta(days=round(days))
+
+
+FORECAST_KEYS = ("salt_per_regeneration", "next_regeneration", "out_of_salt_forecast")
+SENSOR_KEYS = (*SENSOR_PROJECTIONS, *FORECAST_KEYS)
+
+
+def project_forecast(
+    forecaster: SaltForecaster, today: datetime
+) -> dict[str, SensorProjection]:
+    """Compute the state of the forecast sensors."""
+    salt_per_regeneration = forecaster.salt_per_regeneration
+    return {
+        "salt_per_regeneration": SensorProjection(
+            None if salt_per_regeneration is None else round(salt_per_regeneration, 1)
+        ),
+        "next_regeneration": SensorProjection(
+            _days_from_today(today, forecaster.days_until_regeneration())
+        ),
+        "out_of_salt_forecast": SensorProjection(
+            _days_from_today(today, forecaster.days_until_out_of_salt())
+        ),
+    }
+
+
+def _round(projection: SensorProjection, digits: int) -> SensorProjection:
+    if not isinstance(projection.value, (int, float)):
+        return projection
+    value = round(projection.value, digits)
+    return replace(projection, value=int(value) if digits <= 0 else value)
+
+
+def project_snapshot(
+    data: IquaSoftenerData,
+    keys: Collection[str] | None = None,
+    forecaster: SaltForecaster | None = None,
+    precision: Mapping[str, int] | None = None,
+) -> dict[str, SensorProjection]:
+    """Compute the state of every requested sensor key in a single pass.
+
+    Without keys every sensor is computed. The forecast sensors are only
+    computed when a forecaster is given and one of them is requested. A sensor
+    whose field never held a valid value has no state.
+    """
+    if keys is None:
+        keys = SENSOR_KEYS
+    tzinfo = data.device_date_time.tzinfo if data.device_date_time else None
+    today = datetime.now(tzinfo).replace(hour=0, minute=0, second=0, microsecond=0)
+    projection = {
+        key: SensorProjection(None)
+        if getattr(data, SENSOR_FIELDS[key]) is None
+        else SENSOR_PROJECTIONS[key](data, today)
+        for key in keys
+        if key in SENSOR_PROJECTIONS
+    }
+    if forecaster is not None and any(key in FORECAST_KEYS for key in keys):
+        forecast = project_forecast(forecaster, today)
+        projection.update((key, forecast[key]) for key in keys if key in forecast)
+    for key, digits in (precision or {}).items():
+        if key in projection:
+            projection[key] = _round(projection[key], digits)
+    return projection
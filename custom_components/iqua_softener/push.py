@@ -0,0 +1,135 @@
+"""Live updates pushed by the iQua cloud."""
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+import logging
+import random
+from typing import TYPE_CHECKING
+
+from aiohttp import ClientError, WSMsgType
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .api import parse_live_update
+from .const import DOMAIN
+from .models import IquaSoftenerException
+
+if TYPE_CHECKING:
+    from .coordinator import IQuaAccountCoordinator, IQuaDeviceCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+RECONNECT_MIN = 5.0
+RECONNECT_MAX = 300.0
+HEARTBEAT = 30.0
+
+
+class IQuaLiveUpdates:
+    """Keeps the live connections of an account open and applies their updates.
+
+    The cloud hands out one websocket per device, so the account keeps one
+    long-lived connection for each softener that has live updates enabled.
+    Every message updates the device coordinator data in place; the regular
+    poll keeps running in the background, at the long interval while live
+    updates are connected.
+    """
+
+    def __init__(self, hass: HomeAssistant, account: IQuaAccountCoordinator) -> None:
+        """Initialize the live updates."""
+        self.hass = hass
+        self.account = account
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.connected: set[str] = set()
+        self.messages = 0
+        self.reconnects = 0
+
+    @property
+    def active(self) -> bool:
+        """Return True while any live connection is open."""
+        return bool(self.connected)
+
+    @callback
+    def async_start(self, device_serial_number: str) -> None:
+        """Open and keep the live connection of a device."""
+        if device_serial_number in self._tasks:
+            return
+        self._tasks[device_serial_number] = self.hass.async_create_background_task(
+            self._async_run(device_serial_number),
+            f"{DOMAIN} live updates {device_serial_number}",
+        )
+
+    @callback
+    def async_stop(self, device_serial_number: str) -> None:
+        """Close the live connection of a device."""
+        self.connected.discard(device_serial_number)
+        if (task := self._tasks.pop(device_serial_number, None)) is not None:
+            task.cancel()
+
+    @callback
+    def async_stop_all(self) -> None:
+        """Close every live connection."""
+        for device_serial_number in list(self._tasks):
+            self.async_stop(device_serial_number)
+
+    async def _async_run(self, device_serial_number: str) -> None:
+        """Connect, read updates and reconnect with back-off until cancelled."""
+        delay = RECONNECT_MIN
+        while True:
+            try:
+                if await self._async_listen(device_serial_number):
+                    delay = RECONNECT_MIN
+            except (IquaSoftenerException, ClientError, TimeoutError) as err:
+                _LOGGER.debug(
+                    "Live updates of %s disconnected: %s", device_serial_number, err
+                )
+            finally:
+                self.connected.discard(device_serial_number)
+
+            self.reconnects += 1
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+            delay = min(delay * 2, RECONNECT_MAX)
+
+    async def _async_listen(self, device_serial_number: str) -> bool:
+        """Read one live connection, return True when any update was received."""
+        coordinator = self.account.devices[device_serial_number]
+        uri = await coordinator.iqua_api.async_get_live_uri()
+        received = False
+        async with self.account.session.client_session.ws_connect(
+            uri, heartbeat=HEARTBEAT
+        ) as websocket:
+            self.connected.add(device_serial_number)
+            _LOGGER.debug("Live updates of %s connected", device_serial_number)
+            async for message in websocket:
+                if message.type != WSMsgType.TEXT:
+                    if message.type == WSMsgType.ERROR:
+                        break
+                    continue
+                try:
+                    changes = parse_live_update(json.loads(message.data))
+                except (IquaSoftenerException, ValueError) as err:
+                    _LOGGER.debug("Ignoring live message: %s", err)
+                    continue
+                received = True
+                self.messages += 1
+                self._async_apply(coordinator, changes)
+        return received
+
+    @callback
+    def _async_apply(self, coordinator: IQuaDeviceCoordinator, changes: dict) -> None:
+        if not changes or coordinator.data is None:
+            return
+        data = coordinator.data
+        if not data.invalid_fields & changes.keys() and all(
+            getattr(data, key) == value for key, value in changes.items()
+        ):
+            return
+        coordinator.async_set_live_data(
+            dataclasses.replace(
+                data,
+                timestamp=dt_util.utcnow(),
+                invalid_fields=data.invalid_fields - changes.keys(),
+                **changes,
+            )
+        )
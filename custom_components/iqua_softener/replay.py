@@ -0,0 +1,200 @@
+"""Recording and offline replay of iQua cloud payloads."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import STORAGE_DIR
+from homeassistant.util import dt as dt_util, slugify
+
+from .api import parse_dashboard
+from .const import DEFAULT_REPLAY_SPEED, DOMAIN
+from .models import IquaSoftenerData, IquaSoftenerException
+
+_LOGGER = logging.getLogger(__name__)
+
+# The recording rotates to a backup file once it grows beyond this size.
+MAX_BYTES = 1024 * 1024
+BACKUP_COUNT = 3
+
+
+def recording_path(hass: HomeAssistant, device_serial_number: str) -> str:
+    """Return the path of the payload recording of a device."""
+    return hass.config.path(
+        STORAGE_DIR, f"{DOMAIN}.recordings", f"{slugify(device_serial_number)}.jsonl"
+    )
+
+
+@dataclass(frozen=True)
+class RecordedPayload:
+    """A dashboard payload, when it was received and how long the cloud took."""
+
+    timestamp: str
+    elapsed: float
+    data: dict[str, Any]
+
+
+class PayloadRecorder:
+    """Appends every raw dashboard payload to a rotating JSON lines file."""
+
+    def __init__(self, hass: HomeAssistant, device_serial_number: str) -> None:
+        """Initialize the recorder."""
+        self.hass = hass
+        self._path = recording_path(hass, device_serial_number)
+
+    @callback
+    def async_record(self, data: dict[str, Any], elapsed: float) -> None:
+        """Schedule the payload to be written."""
+        line = json.dumps(
+            {
+                "timestamp": dt_util.utcnow().isoformat(),
+                "elapsed": round(elapsed, 4),
+                "data": data,
+            },
+            separators=(",", ":"),
+        )
+        self.hass.async_add_executor_job(self._append, line)
+
+    async def async_remove(self) -> None:
+        """Delete the recording and its backups."""
+        await self.hass.async_add_executor_job(self._remove)
+
+    def _remove(self) -> None:
+        for index in range(BACKUP_COUNT + 1):
+            file_path = f"{self._path}.{index}" if index else self._path
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def _append(self, line: str) -> None:
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        if os.path.exists(self._path) and os.path.getsize(self._path) >= MAX_BYTES:
+            for index in range(BACKUP_COUNT - 1, 0, -1):
+                if os.path.exists(f"{self._path}.{index}"):
+                    os.replace(f"{self._path}.{index}", f"{self._path}.{index + 1}")
+            os.replace(self._path, f"{self._path}.1")
+        with open(self._path, "a", encoding="utf-8") as recording_file:
+            recording_file.write(line + "\n")
+
+
+def read_recording(path: str) -> list[RecordedPayload]:
+    """Return the payloads of a recording, oldest first.
+
+    Runs in the executor.
+    """
+    payloads = []
+    for index in range(BACKUP_COUNT, -1, -1):
+        file_path = f"{path}.{index}" if index else path
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, encoding="utf-8") as recording_file:
+            for line in recording_file:
+                try:
+                    item = json.loads(line)
+                    payloads.append(
+                        RecordedPayload(
+                            item["timestamp"], item["elapsed"], item["data"]
+                        )
+                    )
+                except (KeyError, TypeError, ValueError) as err:
+                    _LOGGER.debug("Skipping invalid recorded payload: %s", err)
+    return payloads
+
+
+class IquaSoftenerReplayApi:
+    """Serves recorded payloads in place of the cloud for a single device.
+
+    The replay runs on its own, independent of the poll schedule: each payload
+    follows the previous one after the time between their recorded timestamps
+    divided by speed. A speed of 0 replays without waiting, which runs the
+    whole pipeline as fast as it can process the payloads. The replay stops at
+    the last payload. Replayed data carries its recorded timestamp, so history
+    and leak detection see the same samples at any speed.
+    """
+
+    def __init__(
+        self,
+        device_serial_number: str,
+        payloads: list[RecordedPayload],
+        speed: float = DEFAULT_REPLAY_SPEED,
+    ) -> None:
+        """Initialize the replay."""
+        self._device_serial_number = device_serial_number
+        self._payloads = payloads
+        self._speed = speed
+        self._data: IquaSoftenerData | None = None
+        self.position = 0
+
+    @property
+    def device_serial_number(self) -> str:
+        """Return the serial number of the device."""
+        return self._device_serial_number
+
+    async def async_get_data(
+        self, previous: IquaSoftenerData | None = None
+    ) -> IquaSoftenerData:
+        """Return the payload the replay is at, the first one before it starts."""
+        if not self._payloads:
+            raise IquaSoftenerException(
+                f"No recorded payloads for {self._device_serial_number}"
+            )
+        payload = self._payloads[max(self.position - 1, 0)]
+        self._data = parse_dashboard(payload.data, previous, _received_at(payload))
+        return self._data
+
+    async def async_run(
+        self, async_set_data: Callable[[IquaSoftenerData], None]
+    ) -> None:
+        """Replay the payloads after the current one at their recorded pace."""
+        self.position = max(self.position, 1)
+        while self.position < len(self._payloads):
+            previous = self._payloads[self.position - 1]
+            payload = self._payloads[self.position]
+            delay = 0.0
+            if self._speed:
+                delay = max(0.0, _seconds_between(previous, payload)) / self._speed
+            await asyncio.sleep(delay)
+            self.position += 1
+            self._data = parse_dashboard(
+                payload.data, self._data, _received_at(payload)
+            )
+            async_set_data(self._data)
+        _LOGGER.debug("Replay of %s finished", self._device_serial_number)
+
+    async def async_get_live_uri(self) -> str:
+        """Live updates are not recorded."""
+        raise IquaSoftenerException("Live updates are not available in a replay")
+
+
+def _received_at(payload: RecordedPayload) -> datetime | None:
+    """Return when a payload was recorded, the sample time of its data."""
+    return dt_util.parse_datetime(payload.timestamp)
+
+
+def _seconds_between(first: RecordedPayload, second: RecordedPayload) -> float:
+    first_time = _received_at(first)
+    second_time = _received_at(second)
+    if first_time is None or second_time is None:
+        return 0.0
+    return (second_time - first_time).total_seconds()
+
+
+async def async_get_replay_api(
+    hass: HomeAssistant,
+    device_serial_number: str,
+    speed: float = DEFAULT_REPLAY_SPEED,
+) -> IquaSoftenerReplayApi:
+    """Load the recording of a device into a replay backend."""
+    payloads = await hass.async_add_executor_job(
+        read_recording, recording_path(hass, device_serial_number)
+    )
+    _LOGGER.debug(
+        "Replaying %s recorded payloads for %s", len(payloads), device_serial_number
+    )
+    return IquaSoftenerReplayApi(device_serial_number, payloads, speed)
@@ -0,0 +1,111 @@
+"""Adaptive polling for the IQua Water Softener integration."""
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from datetime import timedelta
+
+from homeassistant.config_entries import ConfigEntry
+
+from .const import (
+    CONF_INTERVAL_SENSORS,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_REQUEST_BUDGET,
+    DEFAULT_INTERVAL_SENSORS,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_REQUEST_BUDGET,
+    IquaSoftenerState,
+)
+from .models import IquaSoftenerData
+
+
+@dataclass(frozen=True)
+class PollSettings:
+    """Polling options of a single config entry, in seconds."""
+
+    interval: int
+    minimum: int
+    maximum: int
+    budget: int
+
+    @classmethod
+    def from_entry(cls, entry: ConfigEntry) -> PollSettings:
+        """Read the polling options of a config entry."""
+        minimum = entry.options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL)
+        return cls(
+            interval=entry.options.get(CONF_INTERVAL_SENSORS, DEFAULT_INTERVAL_SENSORS),
+            minimum=minimum,
+            maximum=max(
+                minimum, entry.options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL)
+            ),
+            budget=entry.options.get(CONF_REQUEST_BUDGET, DEFAULT_REQUEST_BUDGET),
+        )
+
+    @classmethod
+    def combine(cls, settings: Iterable[PollSettings]) -> PollSettings:
+        """Merge the settings of every entry sharing an account.
+
+        The most responsive intervals win, the smallest budget is respected.
+        """
+        settings = list(settings)
+        minimum = min(item.minimum for item in settings)
+        return cls(
+            interval=min(item.interval for item in settings),
+            minimum=minimum,
+            maximum=max(minimum, min(item.maximum for item in settings)),
+            budget=min(item.budget for item in settings),
+        )
+
+
+class AdaptivePollScheduler:
+    """Chooses the poll interval of an account from the activity of its devices.
+
+    The interval drops to the minimum while water is flowing or today's usage
+    is rising, and doubles up to the maximum while every device is idle,
+    offline or failing, or while live updates already deliver the flow. It
+    never exceeds the hourly request budget.
+    """
+
+    def __init__(self, settings: PollSettings) -> None:
+        """Initialize the scheduler."""
+        self.settings = settings
+        self.interval = min(max(settings.interval, settings.minimum), settings.maximum)
+        self._today_use: dict[str, float] = {}
+
+    def update_settings(self, settings: PollSettings) -> None:
+        """Apply new options, keeping the current interval within bounds."""
+        self.settings = settings
+        self.interval = min(max(self.interval, settings.minimum), settings.maximum)
+
+    def next_interval(
+        self,
+        data: Mapping[str, IquaSoftenerData],
+        device_count: int,
+        live_updates: bool = False,
+    ) -> timedelta:
+        """Return the interval until the next poll after a poll result."""
+        if self._is_active(data) and not live_updates:
+            interval = self.settings.minimum
+        else:
+            interval = min(self.interval * 2, self.settings.maximum)
+
+        budget_floor = 3600 * max(device_count, 1) / self.settings.budget
+        self.interval = int(max(interval, self.settings.minimum, budget_floor))
+        return timedelta(seconds=self.interval)
+
+    def _is_active(self, data: Mapping[str, IquaSoftenerData]) -> bool:
+        active = False
+        for serial, device_data in data.items():
+            previous = self._today_use.get(serial)
+            self._today_use[serial] = device_data.today_use
+            if device_data.state == IquaSoftenerState.OFFLINE:
+                continue
+            if device_data.current_water_flow or (
+                previous is not None
+                and device_data.today_use is not None
+                and device_data.today_use > previous
+            ):
+                active = True
+        return active
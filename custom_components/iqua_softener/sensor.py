@@ -1,32 +1,44 @@
 """Weatherbit Sensors for Home Assistant."""
 from __future__ import annotations
-from datetime import datetime, timedelta
+from datetime import datetime
 
 import logging
+from collections.abc import Callable
 from dataclasses import dataclass
+from typing import Any
 
 from homeassistant.components.sensor import (
+    DOMAIN as SENSOR_DOMAIN,
+    RestoreSensor,
     SensorDeviceClass,
     SensorEntity,
     SensorEntityDescription,
+    SensorExtraStoredData,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import (
-    PERCENTAGE,
-    UnitOfVolume,
-)
-from homeassistant.core import HomeAssistant
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfTime, UnitOfVolume
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.typing import StateType
 
 from .const import (
+    ATTR_LAST_VALID,
+    ATTR_STALE,
+    CONF_FLEET_SENSORS,
+    CONF_SENSORS,
+    CONF_WATER_PRICE,
+    DEFAULT_FLEET_SENSORS,
+    DEFAULT_WATER_PRICE,
     DOMAIN,
-    VOLUME_FLOW_RATE_LITERS_PER_MINUTE,
-    VOLUME_FLOW_RATE_GALLONS_PER_MINUTE,
     IquaSoftenerVolumeUnit,
 )
+from .coordinator import IQuaDeviceCoordinator
 from .entity import IQuaEntity
-from .models import IQuaEntryData
+from .fleet import IQuaFleet, async_get_fleet
+from .models import IQuaEntryData, water_used
+from .projection import SENSOR_FIELDS, SensorProjection
 
 
 @dataclass
@@ -89,6 +101,158 @@ SENSOR_TYPES = IQuaSensorEntityDescription = (
         state_class=SensorStateClass.MEASUREMENT,
         icon="mdi:waves",
     ),
+    IQuaSensorEntityDescription(
+        key="salt_per_regeneration",
+        name="Salt used per regeneration",
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:shaker-outline",
+        native_unit_of_measurement=PERCENTAGE,
+    ),
+    IQuaSensorEntityDescription(
+        key="next_regeneration",
+        name="Next regeneration forecast",
+        device_class=SensorDeviceClass.TIMESTAMP,
+    ),
+    IQuaSensorEntityDescription(
+        key="out_of_salt_forecast",
+        name="Out of salt forecast",
+        device_class=SensorDeviceClass.TIMESTAMP,
+    ),
+)
+
+
+def _last_latency(coordinator: IQuaDeviceCoordinator) -> float | None:
+    if (histogram := coordinator.account.metrics.latency.get("update")) is None:
+        return None
+    return round(histogram.last, 3)
+
+
+@dataclass
+class IQuaDiagnosticSensorEntityDescription(SensorEntityDescription):
+    """Describes IQua diagnostic sensor entity."""
+
+    value_fn: Callable[
+        [IQuaDeviceCoordinator], StateType | datetime
+    ] = lambda coordinator: None
+
+
+DIAGNOSTIC_SENSOR_TYPES = (
+    IQuaDiagnosticSensorEntityDescription(
+        key="cloud_requests",
+        name="Cloud requests",
+        icon="mdi:cloud-download",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.account.session.fetch_count,
+    ),
+    IQuaDiagnosticSensorEntityDescription(
+        key="cloud_logins",
+        name="Cloud logins",
+        icon="mdi:login",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.account.session.login_count,
+    ),
+    IQuaDiagnosticSensorEntityDescription(
+        key="update_errors",
+        name="Update errors",
+        icon="mdi:alert-circle-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.account.session.metrics.error_count
+        + coordinator.account.metrics.error_count
+        + coordinator.metrics.error_count,
+    ),
+    IQuaDiagnosticSensorEntityDescription(
+        key="update_latency",
+        name="Update latency",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        value_fn=_last_latency,
+    ),
+    IQuaDiagnosticSensorEntityDescription(
+        key="last_successful_update",
+        name="Last successful update",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda coordinator: coordinator.metrics.last_success,
+    ),
+)
+
+
+@dataclass
+class IQuaFleetSensorEntityDescription(SensorEntityDescription):
+    """Describes IQua fleet sensor entity."""
+
+    value_fn: Callable[[IQuaFleet], StateType | datetime] = lambda fleet: None
+    device_fn: Callable[[IQuaFleet], str | None] | None = None
+
+
+FLEET_SENSOR_TYPES = (
+    IQuaFleetSensorEntityDescription(
+        key="fleet_today_use",
+        name="Today water usage",
+        device_class=SensorDeviceClass.WATER,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfVolume.LITERS,
+        icon="mdi:water-minus",
+        value_fn=lambda fleet: round(fleet.total_today_use, 1),
+    ),
+    IQuaFleetSensorEntityDescription(
+        key="fleet_lowest_salt_level",
+        name="Lowest salt level",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        icon="mdi:water-minus",
+        value_fn=lambda fleet: fleet.lowest_salt_level,
+        device_fn=lambda fleet: fleet.lowest_salt_device,
+    ),
+    IQuaFleetSensorEntityDescription(
+        key="fleet_offline_devices",
+        name="Offline softeners",
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:wifi-off",
+        value_fn=lambda fleet: fleet.offline_devices,
+    ),
+    IQuaFleetSensorEntityDescription(
+        key="fleet_next_out_of_salt",
+        name="Next out of salt",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda fleet: fleet.next_out_of_salt,
+        device_fn=lambda fleet: fleet.next_out_of_salt_device,
+    ),
+)
+
+
+@dataclass
+class IQuaConsumptionSensorEntityDescription(SensorEntityDescription):
+    """Describes IQua consumption sensor entity."""
+
+    resets_on_regeneration: bool = False
+    priced: bool = False
+
+
+CONSUMPTION_SENSOR_TYPES = (
+    IQuaConsumptionSensorEntityDescription(
+        key="lifetime_consumption",
+        name="Lifetime water consumption",
+        device_class=SensorDeviceClass.WATER,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:water-plus",
+    ),
+    IQuaConsumptionSensorEntityDescription(
+        key="regeneration_cycle_use",
+        name="Water usage since regeneration",
+        device_class=SensorDeviceClass.WATER,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:water-sync",
+        resets_on_regeneration=True,
+    ),
+    IQuaConsumptionSensorEntityDescription(
+        key="water_cost",
+        name="Water cost",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        icon="mdi:cash",
+        priced=True,
+    ),
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -101,15 +265,28 @@ async def async_setup_entry(
     entry_data: IQuaEntryData = hass.data[DOMAIN][entry.entry_id]
     iqua_api = entry_data.iqua_api
     coordinator = entry_data.coordinator
-    device_data = entry_data.device_data
 
     entities = []
+    entity_registry = er.async_get(hass)
+    sensor_keys = entry.options.get(CONF_SENSORS)
+
+    def selected(description: SensorEntityDescription) -> bool:
+        if sensor_keys is None or description.key in sensor_keys:
+            return True
+        # Drop sensors deselected in the options from the registry.
+        if entity_id := entity_registry.async_get_entity_id(
+            SENSOR_DOMAIN, DOMAIN, f"{entry.unique_id}_{description.key}"
+        ):
+            entity_registry.async_remove(entity_id)
+        return False
+
     for description in SENSOR_TYPES:
+        if not selected(description):
+            continue
         entities.append(
             IQuaSensor(
                 iqua_api,
                 coordinator,
-                device_data,
                 description,
                 entry,
             )
@@ -120,8 +297,46 @@ async def async_setup_entry(
             description.name,
         )
 
+    water_price = entry.options.get(CONF_WATER_PRICE, DEFAULT_WATER_PRICE)
+    for description in CONSUMPTION_SENSOR_TYPES:
+        if (description.priced and not water_price) or not selected(description):
+            continue
+        entities.append(
+            IQuaConsumptionSensor(
+                iqua_api,
+                coordinator,
+                description,
+                entry,
+            )
+        )
+
+    for description in DIAGNOSTIC_SENSOR_TYPES:
+        entities.append(
+            IQuaDiagnosticSensor(
+                iqua_api,
+                coordinator,
+                description,
+                entry,
+            )
+        )
+
     async_add_entities(entities)
 
+    if entry.options.get(CONF_FLEET_SENSORS, DEFAULT_FLEET_SENSORS):
+        fleet = async_get_fleet(hass)
+
+        @callback
+        def add_fleet_sensors() -> None:
+            async_add_entities(
+                IQuaFleetSensor(fleet, description)
+                for description in FLEET_SENSOR_TYPES
+            )
+
+        # The fleet sensors are shared, only one opted in entry provides them.
+        entry.async_on_unload(
+            fleet.async_add_sensor_provider(entry.entry_id, add_fleet_sensors)
+        )
+
 
 class IQuaSensor(IQuaEntity, SensorEntity):
     """Implementation if IQua sensor."""
@@ -130,7 +345,6 @@ class IQuaSensor(IQuaEntity, SensorEntity):
         self,
         iqua_api,
         coordinator,
-        device_data,
         description,
         entries: ConfigEntry,
     ):
@@ -138,119 +352,281 @@ class IQuaSensor(IQuaEntity, SensorEntity):
         super().__init__(
             iqua_api,
             coordinator,
-            device_data,
             description,
             entries,
         )
         self._attr_name = f"{DOMAIN.capitalize()} {self.entity_description.name}"
 
-    @property
-    def native_value(self) -> StateType:
-        """Return the state of the sensor."""
-        if self.entity_description.key == "state":
-            return str(self.device_data.state.value)
-
-        if self.entity_description.key == "days_since_last_regeneration":
-            return (
-                datetime.now(self.device_data.device_date_time.tzinfo)
-                - timedelta(days=self.device_data.days_since_last_regeneration)
-            ).replace(hour=0, minute=0, second=0)
-
-        if self.entity_description.key == "out_of_salt_estimated_days":
-            return (
-                datetime.now(self.device_data.device_date_time.tzinfo)
-                + timedelta(days=self.device_data.out_of_salt_estimated_days)
-            ).replace(hour=0, minute=0, second=0)
-
-        if self.entity_description.key == "today_consumption":
-            return (
-                self.device_data.today_use * 0.001
-                if self.device_data.volume_unit == IquaSoftenerVolumeUnit.LITERS
-                else self.device_data.today_use * 0.0353146667
-            )
-
+    def _state_signature(self) -> tuple[Any, ...]:
+        """Return everything this sensor publishes, used to detect changes."""
         return (
-            getattr(self.coordinator.data, self.entity_description.key)
-            if self.coordinator.data
-            else None
+            self.available,
+            self.native_value,
+            self.native_unit_of_measurement,
+            self.icon,
+            self.last_reset,
+            self.extra_state_attributes,
         )
 
+    @property
+    def _projection(self) -> SensorProjection | None:
+        return self.coordinator.projection.get(self.entity_description.key)
+
+    @property
+    def _field(self) -> str | None:
+        return SENSOR_FIELDS.get(self.entity_description.key)
+
+    @property
+    def available(self) -> bool:
+        """Return True once the field of the sensor held a valid value."""
+        if not super().available:
+            return False
+        return self._field is None or getattr(self.data, self._field) is not None
+
+    @property
+    def native_value(self) -> StateType | datetime:
+        """Return the state of the sensor."""
+        if (projection := self._projection) is None:
+            return None
+        return projection.value
+
     @property
     def icon(self):
         """Return icon for the sensor."""
-        if self.entity_description.key == "salt_level_percent":
-            if self.device_data.salt_level_percent is not None:
-                level_icon = "mdi:signal-off"
-                if self.device_data.salt_level_percent > 75:
-                    level_icon = "mdi:signal-cellular-3"
-                elif self.device_data.salt_level_percent > 50:
-                    level_icon = "mdi:signal-cellular-2"
-                elif self.device_data.salt_level_percent > 25:
-                    level_icon = "mdi:signal-cellular-1"
-                elif self.device_data.salt_level_percent > 5:
-                    level_icon = "mdi:signal-cellular-outline"
-                return level_icon
-
-            return "mdi:signal"
-
+        if (projection := self._projection) is not None and projection.icon:
+            return projection.icon
         return self.entity_description.icon
 
     @property
     def native_unit_of_measurement(self) -> str | None:
-        # m3 ft3
-        if self.entity_description.key in [
-            "today_use",
-            "total_water_available",
-            "average_daily_use",
-        ]:
-            return (
-                UnitOfVolume.LITERS
-                if self.device_data.volume_unit == IquaSoftenerVolumeUnit.LITERS
-                else UnitOfVolume.GALLONS
-            )
+        if (projection := self._projection) is not None and projection.unit:
+            return projection.unit
+        return super().native_unit_of_measurement
 
-        if self.entity_description.key in ["current_water_flow"]:
-            return (
-                VOLUME_FLOW_RATE_LITERS_PER_MINUTE
-                if self.device_data.volume_unit == IquaSoftenerVolumeUnit.LITERS
-                else VOLUME_FLOW_RATE_GALLONS_PER_MINUTE
-            )
+    @property
+    def last_reset(self) -> datetime | None:
+        if (projection := self._projection) is not None and projection.last_reset:
+            return projection.last_reset
+        return super().last_reset
 
-        if self.entity_description.key in ["today_consumption"]:
-            return (
-                UnitOfVolume.CUBIC_METERS
-                if self.device_data.volume_unit == IquaSoftenerVolumeUnit.LITERS
-                else UnitOfVolume.CUBIC_FEET
-            )
+    @property
+    def extra_state_attributes(self):
+        """Return the sensor state attributes."""
+        attributes = super().extra_state_attributes
+        if (projection := self._projection) is not None and projection.attributes:
+            attributes = {**attributes, **projection.attributes}
+        if (
+            self._field is not None
+            and self.data is not None
+            and self._field in self.data.invalid_fields
+        ):
+            # The value is the last valid one, kept while the cloud sends junk.
+            attributes = {
+                **attributes,
+                ATTR_STALE: True,
+                ATTR_LAST_VALID: self.coordinator.last_valid.get(self._field),
+            }
+        return attributes
 
-        return super().native_unit_of_measurement
+
+@dataclass
+class IQuaConsumptionStoredData(SensorExtraStoredData):
+    """Running total of a consumption sensor, kept across restarts."""
+
+    last_today_use: float | None
+    days_since_last_regeneration: int | None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a dict representation of the stored data."""
+        return {
+            **super().as_dict(),
+            "last_today_use": self.last_today_use,
+            "days_since_last_regeneration": self.days_since_last_regeneration,
+        }
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> IQuaConsumptionStoredData | None:
+        """Initialize the stored data from a dict."""
+        if (sensor_data := SensorExtraStoredData.from_dict(restored)) is None:
+            return None
+        return cls(
+            sensor_data.native_value,
+            sensor_data.native_unit_of_measurement,
+            restored.get("last_today_use"),
+            restored.get("days_since_last_regeneration"),
+        )
+
+
+class IQuaConsumptionSensor(IQuaEntity, RestoreSensor):
+    """Accumulates today_use deltas into a total that survives the daily reset.
+
+    Each update adds the water used since the previous one, so the total costs
+    constant time per poll and never reads the recorder history.
+    """
+
+    entity_description: IQuaConsumptionSensorEntityDescription
+
+    def __init__(
+        self,
+        iqua_api,
+        coordinator,
+        description,
+        entries: ConfigEntry,
+    ):
+        """Initialize an IQua consumption sensor."""
+        super().__init__(
+            iqua_api,
+            coordinator,
+            description,
+            entries,
+        )
+        self._attr_name = f"{DOMAIN.capitalize()} {self.entity_description.name}"
+        self._total = 0.0
+        self._last_today_use: float | None = None
+        self._days_since_last_regeneration: int | None = None
+
+    def _state_signature(self) -> tuple[Any, ...]:
+        """Return everything this sensor publishes, used to detect changes."""
+        return (self.available, self.native_value, self.native_unit_of_measurement)
 
     @property
-    def last_reset(self) -> datetime | None:
-        if self.entity_description.key in ["total_water_available"]:
-            return datetime.now(self.device_data.device_date_time.tzinfo) - timedelta(
-                days=self.device_data.days_since_last_regeneration
-            )
+    def native_value(self) -> float:
+        """Return the state of the sensor."""
+        return round(self._total, 2 if self.entity_description.priced else 1)
 
-        return super().last_reset
+    @property
+    def native_unit_of_measurement(self) -> str | None:
+        """Return the unit of the sensor."""
+        if self.entity_description.priced:
+            return self.hass.config.currency
+        if (data := self.data) is not None and (
+            data.volume_unit == IquaSoftenerVolumeUnit.LITERS
+        ):
+            return UnitOfVolume.LITERS
+        return UnitOfVolume.GALLONS
+
+    @property
+    def extra_restore_state_data(self) -> IQuaConsumptionStoredData:
+        """Return the running total to store across restarts."""
+        return IQuaConsumptionStoredData(
+            self._total,
+            self.native_unit_of_measurement,
+            self._last_today_use,
+            self._days_since_last_regeneration,
+        )
+
+    def _add_sample(self) -> None:
+        """Add the water used since the previous update."""
+        if self.coordinator.replaying:
+            # Replayed samples must not end up in the total kept across restarts.
+            return
+        if (data := self.data) is None or data.today_use is None:
+            return
+        used, self._last_today_use = water_used(
+            self._last_today_use, float(data.today_use)
+        )
+
+        days = data.days_since_last_regeneration
+        if (
+            self.entity_description.resets_on_regeneration
+            and self._days_since_last_regeneration is not None
+            and days is not None
+            and days < self._days_since_last_regeneration
+        ):
+            self._total = 0.0
+        self._days_since_last_regeneration = days
+
+        if self.entity_description.priced:
+            # The price is per 1000 units, a cubic meter or 1000 gallons.
+            used *= self.entry.options.get(CONF_WATER_PRICE, DEFAULT_WATER_PRICE) / 1000
+        self._total += used
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Accumulate the new sample, then write the state if it changed."""
+        self._add_sample()
+        super()._handle_coordinator_update()
+
+    async def async_added_to_hass(self):
+        """Restore the running total and start accumulating."""
+        if (restored := await self.async_get_last_extra_data()) is not None and (
+            stored := IQuaConsumptionStoredData.from_dict(restored.as_dict())
+        ) is not None:
+            self._total = float(stored.native_value or 0)
+            self._last_today_use = stored.last_today_use
+            self._days_since_last_regeneration = stored.days_since_last_regeneration
+        self._add_sample()
+        await super().async_added_to_hass()
+
+
+class IQuaDiagnosticSensor(IQuaEntity, SensorEntity):
+    """Implementation of an IQua diagnostic sensor."""
+
+    entity_description: IQuaDiagnosticSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        iqua_api,
+        coordinator,
+        description,
+        entries: ConfigEntry,
+    ):
+        """Initialize an IQua diagnostic sensor."""
+        super().__init__(
+            iqua_api,
+            coordinator,
+            description,
+            entries,
+        )
+        self._attr_name = f"{DOMAIN.capitalize()} {self.entity_description.name}"
+
+    @property
+    def available(self) -> bool:
+        """Return True, the diagnostics are kept even without device data."""
+        return True
+
+    def _state_signature(self) -> tuple[Any, ...]:
+        """Return everything this sensor publishes, used to detect changes."""
+        return (self.available, self.native_value)
+
+    @property
+    def native_value(self) -> StateType | datetime:
+        """Return the state of the sensor."""
+        return self.entity_description.value_fn(self.coordinator)
+
+
+class IQuaFleetSensor(SensorEntity):
+    """Implementation of an IQua fleet sensor."""
+
+    entity_description: IQuaFleetSensorEntityDescription
+    _attr_should_poll = False
+
+    def __init__(self, fleet: IQuaFleet, description: IQuaFleetSensorEntityDescription):
+        """Initialize an IQua fleet sensor."""
+        self.fleet = fleet
+        self.entity_description = description
+        self._attr_unique_id = f"{DOMAIN}_{description.key}"
+        self._attr_name = f"{DOMAIN.capitalize()} Fleet {description.name}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, "fleet")},
+            manufacturer="IQua",
+            name="IQua Fleet",
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """When entity is added to hass."""
+        self.async_on_remove(self.fleet.async_add_listener(self.async_write_ha_state))
+
+    @property
+    def native_value(self) -> StateType | datetime:
+        """Return the state of the sensor."""
+        return self.entity_description.value_fn(self.fleet)
 
     @property
     def extra_state_attributes(self):
         """Return the sensor state attributes."""
-        if self.entity_description.key == "salt_level_percent":
-            if self.device_data.salt_level_percent is not None:
-                icon_color = "#9C27B0"
-                if self.device_data.salt_level_percent == 100:
-                    icon_color = "#4CAF50"
-                elif self.device_data.salt_level_percent == 80:
-                    icon_color = "#8BC34B"
-                elif self.device_data.salt_level_percent == 60:
-                    icon_color = "#FF9800"
-                elif self.device_data.salt_level_percent == 40:
-                    icon_color = "#F44336"
-                return {
-                    **super().extra_state_attributes,
-                    "icon_color": icon_color,
-                }
-
-        return super().extra_state_attributes
+        if self.entity_description.device_fn is None:
+            return None
+        return {"device_serial_number": self.entity_description.device_fn(self.fleet)}
@@ -0,0 +1,159 @@
+"""Services for the IQua Water Softener integration."""
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+import logging
+import os
+from dataclasses import asdict, fields
+from datetime import datetime, timezone
+
+import homeassistant.helpers.config_validation as cv
+import homeassistant.helpers.device_registry as dr
+import voluptuous as vol
+from homeassistant.const import ATTR_DEVICE_ID
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+from .history import HistoryRecord, IQuaHistory
+from .models import IQuaEntryData
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_REFRESH = "refresh"
+SERVICE_EXPORT_HISTORY = "export_history"
+
+ATTR_FORMAT = "format"
+EXPORT_FORMATS = ["csv", "json"]
+EXPORT_DIR = f"{DOMAIN}_exports"
+# Records read from the history file at a time while exporting.
+EXPORT_CHUNK_SIZE = 1024
+
+REFRESH_SCHEMA = vol.Schema(
+    {vol.Optional(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string])}
+)
+EXPORT_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Optional(ATTR_FORMAT, default="csv"): vol.In(EXPORT_FORMATS),
+    }
+)
+
+
+@callback
+def _async_get_entries(
+    hass: HomeAssistant, device_ids: list[str] | None
+) -> list[IQuaEntryData]:
+    """Return the loaded entries of the given devices, or of every device."""
+    domain_data = hass.data.get(DOMAIN, {})
+    if device_ids is None:
+        entry_ids = list(domain_data)
+    else:
+        device_registry = dr.async_get(hass)
+        entry_ids = []
+        for device_id in device_ids:
+            if (device := device_registry.async_get(device_id)) is None:
+                raise HomeAssistantError(f"Unknown device {device_id}")
+            entry_ids.extend(device.config_entries)
+
+    entries = [
+        entry_data
+        for entry_id in entry_ids
+        if isinstance(entry_data := domain_data.get(entry_id), IQuaEntryData)
+    ]
+    if not entries:
+        raise HomeAssistantError("No loaded IQua softener found")
+    return entries
+
+
+def _export_rows(history: IQuaHistory):
+    for record in history.iter_records(EXPORT_CHUNK_SIZE):
+        row = asdict(record)
+        row["timestamp"] = datetime.fromtimestamp(
+            record.timestamp, timezone.utc
+        ).isoformat()
+        yield row
+
+
+def export_history(history: IQuaHistory, path: str, export_format: str) -> int:
+    """Stream the history of a device to a file, return the number of records.
+
+    Runs in the executor. Records are read and written one chunk at a time, so
+    the history is never loaded into memory as a whole.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as export_file:
+        if export_format == "csv":
+            writer = csv.DictWriter(
+                export_file, [field.name for field in fields(HistoryRecord)]
+            )
+            writer.writeheader()
+            for row in _export_rows(history):
+                writer.writerow(row)
+                count += 1
+        else:
+            export_file.write("[")
+            for row in _export_rows(history):
+                export_file.write(",\n" if count else "\n")
+                export_file.write(json.dumps(row))
+                count += 1
+            export_file.write("\n]\n")
+    return count
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+
+    async def async_refresh(call: ServiceCall) -> None:
+        """Refresh the accounts of the given devices now."""
+        accounts = {
+            entry_data.account
+            for entry_data in _async_get_entries(hass, call.data.get(ATTR_DEVICE_ID))
+        }
+        await asyncio.gather(
+            *(account.async_refresh_coalesced() for account in accounts)
+        )
+        for account in accounts:
+            if not account.last_update_success:
+                raise HomeAssistantError(
+                    f"Refreshing the iQua cloud failed: {account.last_exception}"
+                )
+
+    async def async_export_history(call: ServiceCall) -> ServiceResponse:
+        """Write the stored history of a device to a file."""
+        entry_data = _async_get_entries(hass, [call.data[ATTR_DEVICE_ID]])[0]
+        if (history := entry_data.coordinator.history) is None:
+            raise HomeAssistantError("The device has no history")
+
+        export_format = call.data[ATTR_FORMAT]
+        path = hass.config.path(
+            EXPORT_DIR,
+            f"{slugify(entry_data.iqua_api.device_serial_number)}.{export_format}",
+        )
+        count = await hass.async_add_executor_job(
+            export_history, history, path, export_format
+        )
+        _LOGGER.debug("Exported %s history records to %s", count, path)
+        return {"path": path, "records": count}
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_REFRESH, async_refresh, schema=REFRESH_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_HISTORY,
+        async_export_history,
+        schema=EXPORT_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
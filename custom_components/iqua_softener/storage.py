@@ -0,0 +1,93 @@
+"""Persistent storage for the IQua Water Softener integration."""
+from __future__ import annotations
+
+import logging
+from dataclasses import MISSING, asdict, fields
+from datetime import datetime
+from enum import Enum
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+    IquaSoftenerState,
+    IquaSoftenerVolumeUnit,
+)
+from .models import IquaSoftenerData
+
+_LOGGER = logging.getLogger(__name__)
+
+_FIELD_TYPES = {
+    "state": IquaSoftenerState,
+    "volume_unit": IquaSoftenerVolumeUnit,
+    "timestamp": datetime.fromisoformat,
+    "device_date_time": datetime.fromisoformat,
+    "invalid_fields": frozenset,
+}
+
+
+def snapshot_to_dict(data: IquaSoftenerData) -> dict[str, Any]:
+    """Convert IquaSoftenerData into a JSON serializable dict."""
+    result = {}
+    for key, value in asdict(data).items():
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, Enum):
+            value = value.value
+        elif isinstance(value, frozenset):
+            value = sorted(value)
+        result[key] = value
+    return result
+
+
+def snapshot_from_dict(stored: dict[str, Any]) -> IquaSoftenerData:
+    """Rebuild IquaSoftenerData from its stored representation."""
+    values = {}
+    for field in fields(IquaSoftenerData):
+        if field.name not in stored and field.default is not MISSING:
+            # Snapshots written before the field was added.
+            continue
+        value = stored[field.name]
+        if value is not None and field.name in _FIELD_TYPES:
+            value = _FIELD_TYPES[field.name](value)
+        values[field.name] = value
+    return IquaSoftenerData(**values)
+
+
+class IQuaSnapshotStore:
+    """Keeps the last successful IquaSoftenerData of a config entry on disk."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the store."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}"
+        )
+        self._data: IquaSoftenerData | None = None
+
+    async def async_load(self) -> IquaSoftenerData | None:
+        """Return the cached snapshot, or None when there is no usable cache."""
+        if (stored := await self._store.async_load()) is None:
+            return None
+
+        try:
+            return snapshot_from_dict(stored["data"])
+        except (KeyError, TypeError, ValueError) as err:
+            _LOGGER.debug("Ignoring invalid cached snapshot: %s", err)
+            return None
+
+    @callback
+    def async_save(self, data: IquaSoftenerData) -> None:
+        """Schedule a save of the latest snapshot."""
+        self._data = data
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Remove the stored snapshot."""
+        await self._store.async_remove()
+
+    def _data_to_save(self) -> dict[str, Any]:
+        return {"data": snapshot_to_dict(self._data)}
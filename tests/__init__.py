@@ -0,0 +1 @@
+"""Tests for the IQua Water Softener integration."""
@@ -0,0 +1 @@
+"""Performance benchmarks of the IQua Water Softener integration."""
@@ -0,0 +1,74 @@
+"""Result collection for the IQua Water Softener benchmarks.
+
+Every benchmark reports a few lower-is-better metrics. The results are written
+to a JSON file and compared with baseline.json, failing when a metric got more
+than TOLERANCE times worse. Run with --benchmark-update to store the results as
+the new baseline.
+"""
+from __future__ import annotations
+
+import json
+from collections.abc import Callable, Generator
+from pathlib import Path
+
+import pytest
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+RESULTS_PATH = Path(__file__).with_name("results.json")
+
+# Timings vary between machines and runs, only large regressions fail.
+TOLERANCE = 2.0
+# Metrics below this are noise and never fail.
+NOISE_FLOOR = 0.001
+
+BenchmarkRecorder = Callable[[str, dict[str, float]], None]
+
+
+@pytest.fixture(scope="session")
+def benchmark_results(
+    pytestconfig: pytest.Config,
+) -> Generator[dict[str, dict[str, float]], None, None]:
+    """Collect the results of every benchmark and write them at the end."""
+    results: dict[str, dict[str, float]] = {}
+    yield results
+    if not results:
+        return
+    path = Path(pytestconfig.getoption("--benchmark-json") or RESULTS_PATH)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    if pytestconfig.getoption("--benchmark-update"):
+        baseline = _load_baseline()
+        baseline.update(results)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+def _load_baseline() -> dict[str, dict[str, float]]:
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text())
+
+
+@pytest.fixture
+def record_benchmark(
+    pytestconfig: pytest.Config, benchmark_results: dict[str, dict[str, float]]
+) -> BenchmarkRecorder:
+    """Return a function storing a result and checking it against the baseline."""
+    baseline = _load_baseline()
+    update = pytestconfig.getoption("--benchmark-update")
+
+    def record(name: str, metrics: dict[str, float]) -> None:
+        benchmark_results[name] = {
+            metric: round(value, 6) for metric, value in metrics.items()
+        }
+        print(f"\n{name}: {json.dumps(benchmark_results[name], sort_keys=True)}")
+        if update or name not in baseline:
+            return
+        regressions = [
+            f"{metric}: {value:.6g} vs baseline {baseline[name][metric]:.6g}"
+            for metric, value in metrics.items()
+            if metric in baseline[name]
+            and value > NOISE_FLOOR
+            and value > baseline[name][metric] * TOLERANCE
+        ]
+        assert not regressions, f"{name} regressed: " + ", ".join(regressions)
+
+    return record
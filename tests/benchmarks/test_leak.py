@@ -0,0 +1,78 @@
+"""Replay benchmark of the leak detector over a recorded week of polls."""
+from __future__ import annotations
+
+import gzip
+import shutil
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from homeassistant.util import dt as dt_util
+
+from custom_components.iqua_softener.leak import LeakDetector
+from custom_components.iqua_softener.models import IquaSoftenerData
+from custom_components.iqua_softener.replay import (
+    IquaSoftenerReplayApi,
+    read_recording,
+)
+
+from .conftest import BenchmarkRecorder
+
+# A poll every minute for a week from 2024-02-05 00:00 UTC: showers morning
+# and evening, a short flow every night and a leak from 01:00 on the last night.
+RECORDING = Path(__file__).parents[1] / "fixtures" / "leak_week.jsonl.gz"
+LEAK_FROM = timedelta(days=6, hours=1)
+
+pytestmark = pytest.mark.benchmark
+
+
+async def test_leak_replay(
+    record_benchmark: BenchmarkRecorder,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Replay the recorded week, checking the leak is found on the last night.
+
+    Samples are parsed by the replay backend, like a replayed entry, and the
+    time spent in the detector alone is reported as well.
+    """
+    # The softener was recorded in UTC, night hours are in local time.
+    monkeypatch.setattr(dt_util, "DEFAULT_TIME_ZONE", dt_util.UTC)
+    path = tmp_path / "recording.jsonl"
+    with gzip.open(RECORDING) as recording, path.open("wb") as target:
+        shutil.copyfileobj(recording, target)
+    payloads = read_recording(str(path))
+    replay_api = IquaSoftenerReplayApi("SN0001", payloads, speed=0)
+    detector = LeakDetector()
+    detected: dict[str, datetime] = {}
+    detector_seconds = 0.0
+
+    def add(data: IquaSoftenerData) -> None:
+        nonlocal detector_seconds
+        started = time.perf_counter()
+        detector.add(data)
+        detector_seconds += time.perf_counter() - started
+        for flag in ("continuous_flow", "night_usage", "high_daily_use"):
+            if getattr(detector, flag):
+                detected.setdefault(flag, data.timestamp)
+
+    started = time.perf_counter()
+    add(await replay_api.async_get_data())
+    await replay_api.async_run(add)
+    replay_seconds = time.perf_counter() - started
+
+    assert replay_api.position == len(payloads)
+    leak_start = dt_util.parse_datetime(payloads[0].timestamp) + LEAK_FROM
+    assert leak_start < detected["night_usage"] < leak_start + timedelta(hours=1)
+    assert detected["continuous_flow"] == leak_start + detector.flow_duration
+    assert detected["high_daily_use"] > leak_start
+
+    record_benchmark(
+        "leak_replay_week",
+        {
+            "replay_seconds": replay_seconds,
+            "sample_microseconds": replay_seconds / len(payloads) * 1e6,
+            "detector_microseconds": detector_seconds / len(payloads) * 1e6,
+        },
+    )
@@ -0,0 +1,101 @@
+"""Load benchmark of setup, polling and state writes against the fake cloud."""
+from __future__ import annotations
+
+import time
+import tracemalloc
+from functools import partial
+from unittest.mock import patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.iqua_softener.const import DATA_ACCOUNTS, DOMAIN
+from custom_components.iqua_softener.governor import RequestGovernor
+
+from ..conftest import async_unload_entries, create_entry
+from ..fake_ecowater import USERNAME, FakeEcowater
+from .conftest import BenchmarkRecorder
+
+REFRESHES = 10
+
+pytestmark = pytest.mark.benchmark
+
+
+async def _async_setup(hass: HomeAssistant, cloud: FakeEcowater) -> None:
+    # One at a time, the fake cloud shares the event loop and would time out
+    # behind hundreds of concurrent setups.
+    for serial in cloud.dashboards:
+        entry = create_entry(hass, serial)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def _async_refresh(hass: HomeAssistant, cloud: FakeEcowater, step: int) -> None:
+    for serial in cloud.dashboards:
+        # Half of the values change every poll, like a softener in use.
+        cloud.set_values(
+            serial,
+            gallons_used_today=120 + step,
+            current_water_flow_gpm=float(step % 2),
+        )
+    await hass.data[DOMAIN][DATA_ACCOUNTS][USERNAME].async_refresh()
+    await hass.async_block_till_done()
+
+
+def _written_updates(hass: HomeAssistant) -> int:
+    account = hass.data[DOMAIN][DATA_ACCOUNTS][USERNAME]
+    return sum(device.written_updates for device in account.devices.values())
+
+
+@pytest.mark.parametrize("devices", [1, 50, 500])
+async def test_setup_and_refresh(
+    hass: HomeAssistant,
+    socket_enabled: None,
+    record_benchmark: BenchmarkRecorder,
+    devices: int,
+) -> None:
+    """Measure setup, refresh time, state writes and peak memory.
+
+    The request governor is opened up so the benchmark measures the
+    integration instead of the per account rate limit. Memory is measured in
+    a second, traced run so tracing does not slow down the timed run.
+    """
+    cloud = FakeEcowater(devices)
+    await cloud.start()
+    with patch(
+        "custom_components.iqua_softener.api.DEFAULT_API_BASE_URL", cloud.base_url
+    ), patch(
+        "custom_components.iqua_softener.api.RequestGovernor",
+        partial(RequestGovernor, rate=1e6, burst=1_000_000),
+    ):
+        started = time.perf_counter()
+        await _async_setup(hass, cloud)
+        setup_seconds = time.perf_counter() - started
+
+        writes = _written_updates(hass)
+        started = time.perf_counter()
+        for step in range(1, REFRESHES + 1):
+            await _async_refresh(hass, cloud, step)
+        refresh_seconds = (time.perf_counter() - started) / REFRESHES
+        writes_per_refresh = (_written_updates(hass) - writes) / REFRESHES
+        await async_unload_entries(hass)
+
+        tracemalloc.start()
+        for entry in hass.config_entries.async_entries(DOMAIN):
+            await hass.config_entries.async_remove(entry.entry_id)
+        await _async_setup(hass, cloud)
+        await _async_refresh(hass, cloud, REFRESHES + 1)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        await async_unload_entries(hass)
+    await cloud.close()
+
+    record_benchmark(
+        f"load_{devices}_devices",
+        {
+            "setup_seconds": setup_seconds,
+            "refresh_seconds": refresh_seconds,
+            "state_writes_per_refresh": writes_per_refresh,
+            "peak_memory_mb": peak / 1024 / 1024,
+        },
+    )
@@ -0,0 +1,50 @@
+"""Micro-benchmark of projecting snapshots into sensor states."""
+from __future__ import annotations
+
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.iqua_softener.api import parse_dashboard
+from custom_components.iqua_softener.coordinator import IQuaDeviceCoordinator
+from custom_components.iqua_softener.projection import SENSOR_KEYS
+
+from ..fake_ecowater import dashboard_payload, serial_number
+from .conftest import BenchmarkRecorder
+
+UPDATES = 100
+# Every sensor reads a handful of properties when its state is written.
+READS_PER_SENSOR = 5
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.mark.parametrize("devices", [1, 10, 100])
+async def test_projection(
+    hass: HomeAssistant, record_benchmark: BenchmarkRecorder, devices: int
+) -> None:
+    """Measure projecting every update once and reading it from every sensor."""
+    coordinators = []
+    for index in range(devices):
+        api = MagicMock(device_serial_number=serial_number(index))
+        coordinators.append(IQuaDeviceCoordinator(hass, MagicMock(), api))
+    updates = [
+        parse_dashboard(dashboard_payload(gallons_used_today=step))
+        for step in range(UPDATES)
+    ]
+
+    started = time.perf_counter()
+    for data in updates:
+        for coordinator in coordinators:
+            coordinator.data = data
+            for _ in range(READS_PER_SENSOR):
+                for key in SENSOR_KEYS:
+                    coordinator.projection.get(key)
+    update_seconds = (time.perf_counter() - started) / UPDATES
+
+    record_benchmark(
+        f"projection_{devices}_devices",
+        {"update_seconds": update_seconds},
+    )
@@ -0,0 +1,71 @@
+"""Profile of importing and setting up the integration."""
+from __future__ import annotations
+
+import cProfile
+import pstats
+import subprocess
+import sys
+import time
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from ..conftest import async_unload_entries, create_entry
+from ..fake_ecowater import FakeEcowater
+from .conftest import BenchmarkRecorder
+
+IMPORT_RUNS = 3
+IMPORT_TIME = """
+import time
+import homeassistant.helpers.entity_platform
+started = time.perf_counter()
+import custom_components.iqua_softener.config_flow
+import custom_components.iqua_softener.sensor
+print(time.perf_counter() - started)
+"""
+
+pytestmark = pytest.mark.benchmark
+
+
+def test_import_time(record_benchmark: BenchmarkRecorder) -> None:
+    """Measure a cold import of the integration, on top of Home Assistant."""
+    import_seconds = min(
+        float(
+            subprocess.run(
+                [sys.executable, "-c", IMPORT_TIME],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+        )
+        for _ in range(IMPORT_RUNS)
+    )
+    record_benchmark("startup_import", {"import_seconds": import_seconds})
+
+
+async def test_setup_profile(
+    hass: HomeAssistant,
+    fake_cloud: FakeEcowater,
+    record_benchmark: BenchmarkRecorder,
+) -> None:
+    """Profile setting up one entry, printing where the time goes."""
+    entry = create_entry(hass)
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    profiler.disable()
+    setup_seconds = time.perf_counter() - started
+
+    stats = pstats.Stats(profiler)
+    stats.sort_stats("cumulative").print_stats("iqua_softener", 20)
+    await async_unload_entries(hass)
+
+    record_benchmark(
+        "startup_setup",
+        {
+            "setup_seconds": setup_seconds,
+            "function_calls": stats.total_calls,
+        },
+    )
@@ -0,0 +1,114 @@
+"""Fixtures for the IQua Water Softener tests."""
+from __future__ import annotations
+
+from collections.abc import AsyncGenerator
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from homeassistant.components.recorder import Recorder
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.iqua_softener.const import (
+    CONF_DEVICE_SERIAL_NUMBER,
+    CONF_INTERVAL_SENSORS,
+    DEFAULT_INTERVAL_SENSORS,
+    DOMAIN,
+)
+
+from .fake_ecowater import PASSWORD, USERNAME, FakeEcowater
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Add the benchmark options."""
+    parser.addoption(
+        "--benchmark", action="store_true", help="run the performance benchmarks"
+    )
+    parser.addoption(
+        "--benchmark-json",
+        default=None,
+        help="file to write the benchmark results to",
+    )
+    parser.addoption(
+        "--benchmark-update",
+        action="store_true",
+        help="store the benchmark results as the new baseline",
+    )
+
+
+def pytest_collection_modifyitems(
+    config: pytest.Config, items: list[pytest.Item]
+) -> None:
+    """Skip the benchmarks unless asked for."""
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmarks only run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(
+    recorder_mock: Recorder, enable_custom_integrations: None
+) -> None:
+    """Load the integration from custom_components, with the recorder it needs."""
+
+
+@pytest.fixture(autouse=True)
+def isolated_config_dir(hass: HomeAssistant, tmp_path: Path) -> None:
+    """Keep the history and recording files of every test apart."""
+    hass.config.config_dir = str(tmp_path)
+
+
+@pytest.fixture
+async def fake_cloud(socket_enabled: None) -> AsyncGenerator[FakeEcowater, None]:
+    """Run a fake Ecowater cloud with one device and point the client at it."""
+    cloud = FakeEcowater()
+    await cloud.start()
+    with patch(
+        "custom_components.iqua_softener.api.DEFAULT_API_BASE_URL", cloud.base_url
+    ):
+        yield cloud
+    await cloud.close()
+
+
+def create_entry(
+    hass: HomeAssistant,
+    serial: str = "SN0001",
+    options: dict | None = None,
+    username: str = USERNAME,
+) -> MockConfigEntry:
+    """Add a config entry of a softener to hass."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title=f"IQua {serial}",
+        unique_id=f"{DOMAIN}_{serial}",
+        data={
+            CONF_USERNAME: username,
+            CONF_PASSWORD: PASSWORD,
+            CONF_DEVICE_SERIAL_NUMBER: serial,
+        },
+        options={CONF_INTERVAL_SENSORS: DEFAULT_INTERVAL_SENSORS, **(options or {})},
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, serial: str = "SN0001", options: dict | None = None
+) -> MockConfigEntry:
+    """Set up a softener through the fake cloud and return its entry."""
+    entry = create_entry(hass, serial, options)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+async def async_unload_entries(hass: HomeAssistant) -> None:
+    """Unload every entry, stopping the polls and live connections."""
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,199 @@
+"""Local fake of the Ecowater iQua cloud for tests and benchmarks."""
+from __future__ import annotations
+
+import asyncio
+import copy
+from collections import Counter
+from typing import Any
+
+from aiohttp import WSMsgType, web
+from aiohttp.test_utils import TestServer
+
+USERNAME = "user@example.com"
+PASSWORD = "secret"
+TOKEN_EXPIRES_IN = 3600
+
+
+def dashboard_payload(serial: str = "SN0001", **values: Any) -> dict[str, Any]:
+    """Return a realistic dashboard payload, with values overriding the defaults.
+
+    Values are given by dashboard key, for example gallons_used_today=120. A
+    dict value replaces the whole field, anything else its value.
+    """
+    payload: dict[str, Any] = {
+        "serial_number": serial,
+        "model_description": {"value": "EcoWater ERRC3702R30"},
+        "model_id": {"value": 1234},
+        "base_software_version": {"value": "5.15"},
+        "power": "Online",
+        "device_date": "2024-03-01T12:00:00",
+        "tz": "Europe/Copenhagen",
+        "volume_unit_enum": {"value": 1},
+        "current_water_flow_gpm": {"value": 0.0, "converted_value": 0.0},
+        "gallons_used_today": {"value": 32, "converted_value": 120},
+        "avg_daily_use_gals": {"value": 79, "converted_value": 300},
+        "total_outlet_water_gals": {"value": 528, "converted_value": 2000},
+        "days_since_last_recharge": {"value": 3},
+        "salt_level_tenths": {"value": 500, "percent": 80},
+        "out_of_salt_estimate_days": {"value": 40},
+        "hardness_grains": {"value": 15},
+        "water_shutoff_valve": {"value": 1},
+    }
+    for key, value in values.items():
+        if isinstance(value, dict) or key in ("power", "device_date", "tz"):
+            payload[key] = value
+        else:
+            field = payload[key]
+            field["converted_value" if "converted_value" in field else "value"] = value
+    return payload
+
+
+class FakeEcowater:
+    """Serves sign in, dashboards and live updates for any number of devices.
+
+    Statuses queued in errors are returned, one per request, before requests
+    succeed again. Every request waits latency seconds first.
+    """
+
+    def __init__(self, devices: int = 1, latency: float = 0.0) -> None:
+        """Initialize the fake cloud."""
+        self.username = USERNAME
+        self.password = PASSWORD
+        self.latency = latency
+        self.dashboards: dict[str, dict[str, Any]] = {
+            serial_number(index): dashboard_payload(serial_number(index))
+            for index in range(devices)
+        }
+        self.errors: list[int] = []
+        self.retry_after: str | None = None
+        self.requests: Counter[str] = Counter()
+        self.tokens: set[str] = set()
+        self.websockets: dict[str, web.WebSocketResponse] = {}
+        self._ws_connected: dict[str, asyncio.Event] = {}
+        self._server: TestServer | None = None
+
+        app = web.Application()
+        app.router.add_post("/v1/auth/signin", self._signin)
+        app.router.add_get("/v1/system/{serial}/dashboard", self._dashboard)
+        app.router.add_post("/v1/system/{serial}/live", self._live)
+        app.router.add_get("/ws/{serial}", self._websocket)
+        self.app = app
+
+    @property
+    def base_url(self) -> str:
+        """Return the API base URL of the running server."""
+        assert self._server is not None
+        return str(self._server.make_url("/v1"))
+
+    async def start(self) -> None:
+        """Start serving on a free local port."""
+        self._server = TestServer(self.app, host="127.0.0.1")
+        await self._server.start_server()
+
+    async def close(self) -> None:
+        """Close the live connections and stop serving."""
+        for websocket in list(self.websockets.values()):
+            await websocket.close()
+        if self._server is not None:
+            await self._server.close()
+
+    def add_device(self, serial: str, **values: Any) -> dict[str, Any]:
+        """Add a device and return its dashboard payload."""
+        self.dashboards[serial] = dashboard_payload(serial, **values)
+        return self.dashboards[serial]
+
+    def set_values(self, serial: str, **values: Any) -> None:
+        """Change dashboard values of a device, by dashboard key."""
+        updated = dashboard_payload(serial, **values)
+        for key in values:
+            self.dashboards[serial][key] = updated[key]
+
+    def expire_tokens(self) -> None:
+        """Reject every token handed out so far."""
+        self.tokens.clear()
+
+    async def wait_live_connected(self, serial: str) -> None:
+        """Wait until the device has an open live connection."""
+        await self._ws_connected.setdefault(serial, asyncio.Event()).wait()
+
+    async def send_live(self, serial: str, message: dict[str, Any]) -> None:
+        """Push a live update message to the device connection."""
+        await self.websockets[serial].send_json(message)
+
+    async def close_live(self, serial: str) -> None:
+        """Drop the live connection of a device."""
+        self._ws_connected.pop(serial, None)
+        if (websocket := self.websockets.pop(serial, None)) is not None:
+            await websocket.close()
+
+    async def _respond(self, kind: str, data: Any) -> web.Response:
+        self.requests[kind] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.errors:
+            headers = {"Retry-After": self.retry_after} if self.retry_after else {}
+            return web.json_response(
+                {"code": "ERROR", "message": "Simulated error"},
+                status=self.errors.pop(0),
+                headers=headers,
+            )
+        return web.json_response({"code": "OK", "message": "", "data": data})
+
+    def _authorized(self, request: web.Request) -> bool:
+        token_type, _, token = request.headers.get("Authorization", "").partition(" ")
+        return token_type == "Bearer" and token in self.tokens
+
+    async def _signin(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if body != {"username": self.username, "password": self.password}:
+            self.requests["signin"] += 1
+            return web.json_response(
+                {"code": "AUTH_FAILED", "message": "Invalid credentials"}, status=401
+            )
+        token = f"token-{self.requests['signin']}"
+        self.tokens.add(token)
+        return await self._respond(
+            "signin",
+            {
+                "access_token": token,
+                "token_type": "Bearer",
+                "expires_in": TOKEN_EXPIRES_IN,
+            },
+        )
+
+    async def _dashboard(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            self.requests["dashboard"] += 1
+            return web.json_response({"code": "UNAUTHORIZED"}, status=401)
+        serial = request.match_info["serial"]
+        if serial not in self.dashboards:
+            self.requests["dashboard"] += 1
+            return web.json_response({"code": "NOT_FOUND"}, status=404)
+        return await self._respond("dashboard", copy.deepcopy(self.dashboards[serial]))
+
+    async def _live(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            self.requests["live"] += 1
+            return web.json_response({"code": "UNAUTHORIZED"}, status=401)
+        serial = request.match_info["serial"]
+        websocket_uri = str(self._server.make_url(f"/ws/{serial}")).replace(
+            "http://", "ws://"
+        )
+        return await self._respond("live", {"websocket_uri": websocket_uri})
+
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        serial = request.match_info["serial"]
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        self.requests["websocket"] += 1
+        self.websockets[serial] = websocket
+        self._ws_connected.setdefault(serial, asyncio.Event()).set()
+        async for message in websocket:
+            if message.type == WSMsgType.ERROR:
+                break
+        return websocket
+
+
+def serial_number(index: int) -> str:
+    """Return the serial number of the device at index."""
+    return f"SN{index + 1:04d}"
@@ -0,0 +1,148 @@
+"""Tests for the async iQua cloud client."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from custom_components.iqua_softener.api import (
+    IquaSoftenerApi,
+    IquaSoftenerAuthError,
+    IquaSoftenerSession,
+    parse_live_update,
+)
+from custom_components.iqua_softener.const import (
+    IquaSoftenerState,
+    IquaSoftenerVolumeUnit,
+)
+from custom_components.iqua_softener.models import IquaSoftenerException
+
+from .fake_ecowater import PASSWORD, USERNAME, FakeEcowater, serial_number
+
+
+def _api(hass: HomeAssistant, password: str = PASSWORD) -> IquaSoftenerApi:
+    session = IquaSoftenerSession(async_get_clientsession(hass), USERNAME, password)
+    return IquaSoftenerApi(session, "SN0001")
+
+
+async def test_get_data(hass: HomeAssistant, fake_cloud: FakeEcowater) -> None:
+    """Test the dashboard is returned as IquaSoftenerData."""
+    data = await _api(hass).async_get_data()
+
+    assert data.model == "EcoWater ERRC3702R30 (1234)"
+    assert data.software_version == "5.15"
+    assert data.state is IquaSoftenerState.ONLINE
+    assert data.device_date_time.tzinfo is not None
+    assert data.volume_unit is IquaSoftenerVolumeUnit.LITERS
+    assert data.current_water_flow == 0.0
+    assert data.today_use == 120
+    assert data.average_daily_use == 300
+    assert data.total_water_available == 2000
+    assert data.days_since_last_regeneration == 3
+    assert data.salt_level == 50.0
+    assert data.salt_level_percent == 80
+    assert data.out_of_salt_estimated_days == 40
+    assert data.hardness_grains == 15
+    assert data.water_shutoff_valve_state == 1
+    assert not data.invalid_fields
+
+
+async def test_token_is_reused(hass: HomeAssistant, fake_cloud: FakeEcowater) -> None:
+    """Test polls share one sign in until the token is rejected."""
+    api = _api(hass)
+    await api.async_get_data()
+    await api.async_get_data()
+    assert fake_cloud.requests["signin"] == 1
+    assert fake_cloud.requests["dashboard"] == 2
+
+    fake_cloud.expire_tokens()
+    fake_cloud.set_values("SN0001", gallons_used_today=150)
+    data = await api.async_get_data()
+    assert data.today_use == 150
+    assert fake_cloud.requests["signin"] == 2
+    assert api.session.login_count == 2
+
+
+async def test_concurrent_requests_sign_in_once(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test concurrent polls on a cold or rejected token share one sign in."""
+    fake_cloud.latency = 0.05
+    for index in range(1, 5):
+        fake_cloud.add_device(serial_number(index))
+    session = IquaSoftenerSession(async_get_clientsession(hass), USERNAME, PASSWORD)
+    apis = [IquaSoftenerApi(session, serial_number(index)) for index in range(5)]
+
+    await asyncio.gather(*(api.async_get_data() for api in apis))
+    assert fake_cloud.requests["signin"] == 1
+    assert fake_cloud.requests["dashboard"] == 5
+
+    fake_cloud.expire_tokens()
+    await asyncio.gather(*(api.async_get_data() for api in apis))
+    assert fake_cloud.requests["signin"] == 2
+    assert fake_cloud.requests["dashboard"] == 15
+    assert session.login_count == 2
+
+
+async def test_rejected_credentials(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test a rejected password is not tried again."""
+    api = _api(hass, password="wrong")
+    with pytest.raises(IquaSoftenerAuthError):
+        await api.async_get_data()
+    assert api.session.auth_failed
+
+    with pytest.raises(IquaSoftenerAuthError):
+        await api.async_get_data()
+    assert fake_cloud.requests["signin"] == 1
+    assert fake_cloud.requests["dashboard"] == 0
+
+
+async def test_unknown_device(hass: HomeAssistant, fake_cloud: FakeEcowater) -> None:
+    """Test a device the account does not own fails the request."""
+    api = IquaSoftenerApi(_api(hass).session, "SN9999")
+    with pytest.raises(IquaSoftenerException):
+        await api.async_get_data()
+
+
+def test_parse_live_update() -> None:
+    """Test live fields are validated like dashboard fields, one by one."""
+    changes = parse_live_update(
+        {
+            "data": {
+                "power": "Offline",
+                "current_water_flow_gpm": {"converted_value": 2.5},
+                "gallons_used_today": {"converted_value": 125},
+                "total_outlet_water_gals": {"value": 528},
+            }
+        }
+    )
+
+    assert changes == {
+        "state": IquaSoftenerState.OFFLINE,
+        "current_water_flow": 2.5,
+        "today_use": 125,
+    }
+
+
+def test_parse_live_update_skips_invalid_fields() -> None:
+    """Test invalid live values are left out instead of overwriting the data."""
+    changes = parse_live_update(
+        {
+            "power": "Exploded",
+            "current_water_flow_gpm": {"converted_value": -1},
+            "gallons_used_today": {"converted_value": "125"},
+            "total_outlet_water_gals": {"converted_value": True},
+        }
+    )
+
+    assert changes == {}
+
+
+def test_parse_live_update_rejects_other_messages() -> None:
+    """Test a message that is not an update is rejected as a whole."""
+    with pytest.raises(IquaSoftenerException):
+        parse_live_update({"data": ["not", "an", "update"]})
@@ -0,0 +1,59 @@
+"""Tests for the IQua Water Softener config flow."""
+from __future__ import annotations
+
+from homeassistant import config_entries
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.iqua_softener.const import CONF_DEVICE_SERIAL_NUMBER, DOMAIN
+
+from .conftest import async_unload_entries
+from .fake_ecowater import PASSWORD, USERNAME, FakeEcowater
+
+
+async def _async_start_flow(hass: HomeAssistant, password: str, serial: str) -> dict:
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    assert result["type"] == FlowResultType.FORM
+    return await hass.config_entries.flow.async_configure(
+        result["flow_id"],
+        {
+            CONF_USERNAME: USERNAME,
+            CONF_PASSWORD: password,
+            CONF_DEVICE_SERIAL_NUMBER: serial,
+        },
+    )
+
+
+async def test_user_flow(hass: HomeAssistant, fake_cloud: FakeEcowater) -> None:
+    """Test the flow validates through the cloud and hands its data to setup."""
+    result = await _async_start_flow(hass, PASSWORD, "SN0001")
+    await hass.async_block_till_done()
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert result["title"] == "IQua SN0001"
+    assert hass.states.get("sensor.iqua_softener_today_water_usage").state == "120"
+    # Setup started from the flow's dashboard and token.
+    assert fake_cloud.requests["signin"] == 1
+    assert fake_cloud.requests["dashboard"] == 1
+    await async_unload_entries(hass)
+
+
+async def test_user_flow_invalid_auth(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test rejected credentials are reported."""
+    result = await _async_start_flow(hass, "wrong", "SN0001")
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"base": "invalid_auth"}
+
+
+async def test_user_flow_unknown_device(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test a serial number the account does not own is reported."""
+    result = await _async_start_flow(hass, PASSWORD, "SN9999")
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"base": "connection_error"}
@@ -0,0 +1,58 @@
+"""Tests for the fleet sensors shared by every softener."""
+from __future__ import annotations
+
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.iqua_softener.const import CONF_FLEET_SENSORS, DOMAIN
+
+from .conftest import async_setup_entry, async_unload_entries
+from .fake_ecowater import FakeEcowater
+
+FLEET_OPTIONS = {CONF_FLEET_SENSORS: True}
+
+
+def _today_use_entity(hass: HomeAssistant) -> er.RegistryEntry:
+    entity_registry = er.async_get(hass)
+    entity_id = entity_registry.async_get_entity_id(
+        "sensor", DOMAIN, f"{DOMAIN}_fleet_today_use"
+    )
+    return entity_registry.async_get(entity_id)
+
+
+async def test_fleet_sensors_aggregate(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test the fleet sensors are provided once and sum every softener."""
+    fake_cloud.add_device("SN0002", gallons_used_today=80)
+    first = await async_setup_entry(hass, "SN0001", FLEET_OPTIONS)
+    await async_setup_entry(hass, "SN0002", FLEET_OPTIONS)
+
+    entity = _today_use_entity(hass)
+    assert entity.config_entry_id == first.entry_id
+    assert hass.states.get(entity.entity_id).state == "200.0"
+    await async_unload_entries(hass)
+
+
+async def test_fleet_sensors_handed_over(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test another opted in entry takes over the fleet sensors on unload."""
+    fake_cloud.add_device("SN0002", gallons_used_today=80)
+    fake_cloud.add_device("SN0003", gallons_used_today=40)
+    first = await async_setup_entry(hass, "SN0001", FLEET_OPTIONS)
+    await async_setup_entry(hass, "SN0002")
+    third = await async_setup_entry(hass, "SN0003", FLEET_OPTIONS)
+
+    await hass.config_entries.async_unload(first.entry_id)
+    await hass.async_block_till_done()
+
+    entity = _today_use_entity(hass)
+    assert entity.config_entry_id == third.entry_id
+    assert hass.states.get(entity.entity_id).state == "120.0"
+
+    await hass.config_entries.async_unload(third.entry_id)
+    await hass.async_block_till_done()
+    assert hass.states.get(entity.entity_id).state == STATE_UNAVAILABLE
+    await async_unload_entries(hass)
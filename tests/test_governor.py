@@ -0,0 +1,148 @@
+"""Tests for the request governor against a throttling fake cloud."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Generator
+from unittest.mock import patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from custom_components.iqua_softener.api import (
+    IquaSoftenerApi,
+    IquaSoftenerSession,
+    IquaSoftenerTransientError,
+)
+from custom_components.iqua_softener.governor import (
+    DEFAULT_BACKOFF_BASE,
+    DEFAULT_FAILURE_THRESHOLD,
+    DEFAULT_MAX_RETRIES,
+    IquaSoftenerCircuitOpenError,
+)
+
+from .fake_ecowater import PASSWORD, USERNAME, FakeEcowater, serial_number
+
+
+@pytest.fixture
+def delays() -> Generator[list[float], None, None]:
+    """Record the back-off delays of the governor instead of waiting."""
+    recorded: list[float] = []
+    sleep = asyncio.sleep
+
+    async def record(delay: float) -> None:
+        recorded.append(delay)
+        await sleep(0)
+
+    with patch("custom_components.iqua_softener.governor.asyncio.sleep", record):
+        yield recorded
+
+
+@pytest.fixture
+async def api(hass: HomeAssistant, fake_cloud: FakeEcowater) -> IquaSoftenerApi:
+    """Return a signed in client of the fake cloud device."""
+    session = IquaSoftenerSession(async_get_clientsession(hass), USERNAME, PASSWORD)
+    api = IquaSoftenerApi(session, "SN0001")
+    await api.async_get_data()
+    return api
+
+
+async def test_retry_after_is_honoured(
+    api: IquaSoftenerApi, fake_cloud: FakeEcowater, delays: list[float]
+) -> None:
+    """Test a 429 is retried after the server's Retry-After."""
+    fake_cloud.errors = [429]
+    fake_cloud.retry_after = "1"
+
+    data = await api.async_get_data()
+
+    assert data.today_use == 120
+    assert delays == [1.0]
+    assert api.session.governor.retries == 1
+    assert fake_cloud.requests["dashboard"] == 3
+
+
+async def test_server_errors_back_off(
+    api: IquaSoftenerApi, fake_cloud: FakeEcowater, delays: list[float]
+) -> None:
+    """Test server errors are retried with jittered exponential back-off."""
+    fake_cloud.errors = [503, 503]
+
+    data = await api.async_get_data()
+
+    assert data.today_use == 120
+    assert len(delays) == 2
+    for attempt, delay in enumerate(delays):
+        assert 0 <= delay <= DEFAULT_BACKOFF_BASE * 2**attempt
+
+
+async def test_retries_are_bounded(
+    api: IquaSoftenerApi, fake_cloud: FakeEcowater, delays: list[float]
+) -> None:
+    """Test a call gives up after the maximum number of retries."""
+    fake_cloud.errors = [503] * (DEFAULT_MAX_RETRIES + 1)
+
+    with pytest.raises(IquaSoftenerTransientError):
+        await api.async_get_data()
+
+    assert len(delays) == DEFAULT_MAX_RETRIES
+    assert not api.session.governor.circuit_open
+
+
+async def test_circuit_opens_after_repeated_failures(
+    api: IquaSoftenerApi, fake_cloud: FakeEcowater, delays: list[float]
+) -> None:
+    """Test repeated failed calls open the circuit and calls fail fast."""
+    fake_cloud.errors = [503] * (DEFAULT_MAX_RETRIES + 1) * DEFAULT_FAILURE_THRESHOLD
+
+    governor = api.session.governor
+    for _ in range(DEFAULT_FAILURE_THRESHOLD):
+        assert not governor.circuit_open
+        with pytest.raises(IquaSoftenerTransientError):
+            await api.async_get_data()
+
+    assert governor.circuit_open
+    assert governor.circuit_opened == 1
+    requests = fake_cloud.requests["dashboard"]
+
+    with pytest.raises(IquaSoftenerCircuitOpenError):
+        await api.async_get_data()
+    assert fake_cloud.requests["dashboard"] == requests
+    assert governor.rejected == 1
+
+
+async def test_transient_errors_of_concurrent_calls(
+    api: IquaSoftenerApi, fake_cloud: FakeEcowater, delays: list[float]
+) -> None:
+    """Test one failure per device during a refresh does not open the circuit."""
+    for index in range(1, DEFAULT_FAILURE_THRESHOLD):
+        fake_cloud.add_device(serial_number(index))
+    apis = [
+        IquaSoftenerApi(api.session, serial_number(index))
+        for index in range(DEFAULT_FAILURE_THRESHOLD)
+    ]
+    fake_cloud.errors = [503] * DEFAULT_FAILURE_THRESHOLD
+
+    results = await asyncio.gather(*(api.async_get_data() for api in apis))
+
+    assert all(data.today_use == 120 for data in results)
+    governor = api.session.governor
+    assert not governor.circuit_open
+    assert governor.as_dict()["consecutive_failures"] == 0
+    assert governor.retries == DEFAULT_FAILURE_THRESHOLD
+
+
+async def test_long_retry_after_pauses_calls(
+    api: IquaSoftenerApi, fake_cloud: FakeEcowater, delays: list[float]
+) -> None:
+    """Test a Retry-After beyond the back-off limit pauses calls instead."""
+    fake_cloud.errors = [429]
+    fake_cloud.retry_after = "3600"
+
+    with pytest.raises(IquaSoftenerTransientError):
+        await api.async_get_data()
+    assert delays == []
+
+    with pytest.raises(IquaSoftenerCircuitOpenError):
+        await api.async_get_data()
+    assert fake_cloud.requests["dashboard"] == 2
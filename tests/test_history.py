@@ -0,0 +1,123 @@
+"""Tests for the local usage history."""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+from unittest.mock import patch
+
+from freezegun.api import FrozenDateTimeFactory
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.iqua_softener.api import parse_dashboard
+from custom_components.iqua_softener.const import STORAGE_SAVE_DELAY
+from custom_components.iqua_softener.history import IQuaHistory
+
+from .fake_ecowater import dashboard_payload
+
+SERIAL = "SN0001"
+
+
+async def _async_add_polls(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory, history: IQuaHistory, *uses
+) -> None:
+    for today_use in uses:
+        freezer.tick(timedelta(minutes=20))
+        history.async_add(
+            parse_dashboard(dashboard_payload(gallons_used_today=today_use))
+        )
+    await hass.async_block_till_done()
+
+
+async def _async_save_checkpoint(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory
+) -> None:
+    freezer.tick(timedelta(seconds=STORAGE_SAVE_DELAY))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+
+async def _async_load(hass: HomeAssistant) -> tuple[IQuaHistory, int]:
+    """Load a new history of the device, return it and the records replayed."""
+    history = IQuaHistory(hass, SERIAL)
+    with patch.object(
+        IQuaHistory,
+        "_async_roll_up",
+        autospec=True,
+        side_effect=IQuaHistory._async_roll_up,
+    ) as roll_up:
+        await history.async_load()
+    return history, roll_up.call_count
+
+
+def _state(history: IQuaHistory) -> dict[str, Any]:
+    return {
+        "total_usage": history.total_usage,
+        "last_timestamp": history.last_record.timestamp,
+        "hourly": [(bucket.start, bucket.usage) for bucket in history.hourly],
+        "forecaster": history.forecaster.as_dict(),
+    }
+
+
+async def test_load_replays_after_checkpoint(
+    hass: HomeAssistant, hass_storage: dict[str, Any], freezer: FrozenDateTimeFactory
+) -> None:
+    """Test startup restores the checkpoint and replays only newer records."""
+    history = IQuaHistory(hass, SERIAL)
+    await history.async_load()
+    await _async_add_polls(hass, freezer, history, 10, 30, 60)
+    await _async_save_checkpoint(hass, freezer)
+    await _async_add_polls(hass, freezer, history, 100, 5)
+
+    loaded, replayed = await _async_load(hass)
+
+    assert replayed == 2
+    assert _state(loaded) == _state(history)
+    assert loaded.total_usage == 95
+
+
+async def test_load_without_checkpoint(
+    hass: HomeAssistant, hass_storage: dict[str, Any], freezer: FrozenDateTimeFactory
+) -> None:
+    """Test the whole file is replayed when there is no usable checkpoint."""
+    history = IQuaHistory(hass, SERIAL)
+    await history.async_load()
+    await _async_add_polls(hass, freezer, history, 10, 30, 60)
+    await _async_save_checkpoint(hass, freezer)
+    hass_storage[f"iqua_softener.history.{SERIAL.lower()}"]["data"] = {"invalid": 1}
+
+    loaded, replayed = await _async_load(hass)
+
+    assert replayed == 3
+    assert loaded.total_usage == history.total_usage
+
+
+async def test_compaction_keeps_newest_records(
+    hass: HomeAssistant, hass_storage: dict[str, Any], freezer: FrozenDateTimeFactory
+) -> None:
+    """Test the file is compacted to the newest records once full."""
+    history = IQuaHistory(hass, SERIAL)
+    await history.async_load()
+    with patch("custom_components.iqua_softener.history.MAX_RECORDS", 5), patch(
+        "custom_components.iqua_softener.history.COMPACTED_RECORDS", 3
+    ):
+        await _async_add_polls(hass, freezer, history, 1, 2, 3, 4, 5)
+
+    records = await hass.async_add_executor_job(lambda: list(history.iter_records()))
+    assert [record.today_use for record in records] == [3, 4, 5]
+
+
+async def test_remove(
+    hass: HomeAssistant, hass_storage: dict[str, Any], freezer: FrozenDateTimeFactory
+) -> None:
+    """Test removing deletes the file and the checkpoint."""
+    history = IQuaHistory(hass, SERIAL)
+    await history.async_load()
+    await _async_add_polls(hass, freezer, history, 10)
+    await _async_save_checkpoint(hass, freezer)
+
+    await history.async_remove()
+
+    loaded, replayed = await _async_load(hass)
+    assert replayed == 0
+    assert loaded.last_record is None
@@ -0,0 +1,167 @@
+"""Tests for the IQua Water Softener setup."""
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+
+from custom_components.iqua_softener.const import (
+    CONF_MIN_INTERVAL,
+    CONF_WATER_PRICE,
+    DATA_ACCOUNTS,
+    DOMAIN,
+    RELOAD_OPTIONS,
+)
+from custom_components.iqua_softener.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+
+from .conftest import async_setup_entry, async_unload_entries
+from .fake_ecowater import USERNAME, FakeEcowater
+
+IMPORTED_MODULES = """
+import json, sys
+import custom_components.iqua_softener.config_flow
+import custom_components.iqua_softener.sensor
+import custom_components.iqua_softener.binary_sensor
+import custom_components.iqua_softener.diagnostics
+print(json.dumps(sorted(sys.modules)))
+"""
+
+# Modules of the integration loaded with its platforms. A new module here has
+# to be worth its import time on every Home Assistant start.
+EXPECTED_MODULES = {
+    "api",
+    "binary_sensor",
+    "config_flow",
+    "const",
+    "coordinator",
+    "diagnostics",
+    "entity",
+    "fleet",
+    "forecast",
+    "governor",
+    "history",
+    "leak",
+    "metrics",
+    "models",
+    "projection",
+    "push",
+    "replay",
+    "scheduler",
+    "sensor",
+    "services",
+    "storage",
+}
+
+# Home Assistant components the integration pulls in: its platforms, the
+# recorder dependency for the statistics import and what those load.
+EXPECTED_COMPONENTS = {
+    "binary_sensor",
+    "diagnostics",
+    "http",
+    "network",
+    "persistent_notification",
+    "recorder",
+    "sensor",
+    "websocket_api",
+}
+
+
+async def test_setup_and_unload(hass: HomeAssistant, fake_cloud: FakeEcowater) -> None:
+    """Test an entry is set up from the cloud and unloaded again."""
+    entry = await async_setup_entry(hass)
+
+    assert entry.state is ConfigEntryState.LOADED
+    assert hass.states.get("sensor.iqua_softener_today_water_usage").state == "120"
+    assert fake_cloud.requests["signin"] == 1
+    assert fake_cloud.requests["dashboard"] == 1
+
+    await async_unload_entries(hass)
+    assert entry.state is ConfigEntryState.NOT_LOADED
+
+
+async def test_options_saved_with_defaults_apply_in_place(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test the first save of the options only reloads for changed options."""
+    entry = await async_setup_entry(hass)
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+
+    # The options flow saves every option, the reload ones at their defaults.
+    hass.config_entries.async_update_entry(
+        entry, options={**entry.options, **RELOAD_OPTIONS, CONF_MIN_INTERVAL: 120}
+    )
+    await hass.async_block_till_done()
+    assert hass.data[DOMAIN][entry.entry_id] is entry_data
+
+    hass.config_entries.async_update_entry(
+        entry, options={**entry.options, CONF_WATER_PRICE: 2.5}
+    )
+    await hass.async_block_till_done()
+    assert hass.data[DOMAIN][entry.entry_id] is not entry_data
+    await async_unload_entries(hass)
+
+
+async def test_reauth_for_every_entry_of_account(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test rejected credentials start a reauth for the remaining entries.
+
+    The account is created by the first entry and must outlive it.
+    """
+    fake_cloud.add_device("SN0002")
+    first = await async_setup_entry(hass, "SN0001")
+    second = await async_setup_entry(hass, "SN0002")
+    await hass.config_entries.async_remove(first.entry_id)
+    await hass.async_block_till_done()
+
+    fake_cloud.password = "changed"
+    fake_cloud.expire_tokens()
+    await hass.data[DOMAIN][DATA_ACCOUNTS][USERNAME].async_refresh()
+    await hass.async_block_till_done()
+
+    flows = hass.config_entries.flow.async_progress_by_handler(DOMAIN)
+    assert [flow["context"]["entry_id"] for flow in flows] == [second.entry_id]
+    assert flows[0]["context"]["source"] == "reauth"
+    await async_unload_entries(hass)
+
+
+async def test_setup_duration(hass: HomeAssistant, fake_cloud: FakeEcowater) -> None:
+    """Test the setup wall time is measured and exposed in diagnostics."""
+    entry = await async_setup_entry(hass)
+
+    setup_duration = hass.data[DOMAIN][entry.entry_id].setup_duration
+    assert 0 < setup_duration < 5
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["setup_duration"] == setup_duration
+    await async_unload_entries(hass)
+
+
+def test_import_graph() -> None:
+    """Test loading the integration imports only the expected modules."""
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORTED_MODULES],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    modules = json.loads(result.stdout)
+
+    integration = {
+        module.split(".")[2]
+        for module in modules
+        if module.startswith("custom_components.iqua_softener.")
+    }
+    components = {
+        module.split(".")[2]
+        for module in modules
+        if module.startswith("homeassistant.components.")
+    }
+
+    assert integration == EXPECTED_MODULES
+    assert components == EXPECTED_COMPONENTS
+    assert "iqua_softener" not in modules
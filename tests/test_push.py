@@ -0,0 +1,100 @@
+"""Tests for the live updates streamed by the iQua cloud."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.iqua_softener.const import CONF_LIVE_UPDATES
+
+from .conftest import async_setup_entry, async_unload_entries
+from .fake_ecowater import FakeEcowater
+
+SERIAL = "SN0001"
+FLOW_ENTITY = "sensor.iqua_softener_current_water_flow"
+
+
+async def _async_wait_for(hass: HomeAssistant, condition: Callable[[], bool]) -> None:
+    """Wait until the live update task has caught up."""
+    for _ in range(200):
+        await hass.async_block_till_done()
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("Live update was not applied")
+
+
+async def test_live_updates_apply(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test pushed flow and usage update the sensors without polling."""
+    await async_setup_entry(hass, options={CONF_LIVE_UPDATES: True})
+    await fake_cloud.wait_live_connected(SERIAL)
+    dashboards = fake_cloud.requests["dashboard"]
+
+    await fake_cloud.send_live(
+        SERIAL,
+        {
+            "data": {
+                "current_water_flow_gpm": {"converted_value": 2.5},
+                "gallons_used_today": {"converted_value": 125},
+            }
+        },
+    )
+    await _async_wait_for(hass, lambda: hass.states.get(FLOW_ENTITY).state == "2.5")
+
+    assert hass.states.get("sensor.iqua_softener_today_water_usage").state == "125"
+    assert fake_cloud.requests["dashboard"] == dashboards
+    await async_unload_entries(hass)
+
+
+async def test_invalid_live_message_is_ignored(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test a malformed message neither breaks the connection nor the state."""
+    await async_setup_entry(hass, options={CONF_LIVE_UPDATES: True})
+    await fake_cloud.wait_live_connected(SERIAL)
+
+    await fake_cloud.send_live(SERIAL, {"data": {"power": "Exploded"}})
+    await fake_cloud.send_live(
+        SERIAL, {"data": {"current_water_flow_gpm": {"converted_value": 1.5}}}
+    )
+    await _async_wait_for(hass, lambda: hass.states.get(FLOW_ENTITY).state == "1.5")
+
+    assert hass.states.get("sensor.iqua_softener_status").state == "Online"
+    assert fake_cloud.requests["websocket"] == 1
+    await async_unload_entries(hass)
+
+
+async def test_reconnects_after_disconnect(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test a dropped connection is opened again and keeps streaming."""
+    with patch("custom_components.iqua_softener.push.RECONNECT_MIN", 0.01):
+        await async_setup_entry(hass, options={CONF_LIVE_UPDATES: True})
+        await fake_cloud.wait_live_connected(SERIAL)
+
+        await fake_cloud.close_live(SERIAL)
+        await fake_cloud.wait_live_connected(SERIAL)
+
+    assert fake_cloud.requests["websocket"] == 2
+    await fake_cloud.send_live(
+        SERIAL, {"data": {"current_water_flow_gpm": {"converted_value": 3.0}}}
+    )
+    await _async_wait_for(hass, lambda: hass.states.get(FLOW_ENTITY).state == "3.0")
+    await async_unload_entries(hass)
+
+
+async def test_unload_closes_connection(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test unloading the entry stops the live updates."""
+    await async_setup_entry(hass, options={CONF_LIVE_UPDATES: True})
+    await fake_cloud.wait_live_connected(SERIAL)
+    websocket = fake_cloud.websockets[SERIAL]
+
+    await async_unload_entries(hass)
+
+    await _async_wait_for(hass, lambda: websocket.closed)
@@ -0,0 +1,145 @@
+"""Tests for recording and replaying cloud payloads."""
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+from collections.abc import Generator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.iqua_softener.const import (
+    CONF_REPLAY_PAYLOADS,
+    CONF_REPLAY_SPEED,
+    DOMAIN,
+    STORAGE_SAVE_DELAY,
+)
+from custom_components.iqua_softener.coordinator import IQuaDeviceCoordinator
+from custom_components.iqua_softener.models import IquaSoftenerData
+from custom_components.iqua_softener.replay import (
+    IquaSoftenerReplayApi,
+    read_recording,
+    recording_path,
+)
+
+from .conftest import async_setup_entry, async_unload_entries
+
+RECORDING = Path(__file__).parent / "fixtures" / "recording.jsonl"
+SERIAL = "SN0001"
+
+
+@pytest.fixture
+def delays() -> Generator[list[float], None, None]:
+    """Record the waits of the replay instead of waiting."""
+    recorded: list[float] = []
+    sleep = asyncio.sleep
+
+    async def record(delay: float) -> None:
+        recorded.append(delay)
+        await sleep(0)
+
+    with patch("custom_components.iqua_softener.replay.asyncio.sleep", record):
+        yield recorded
+
+
+@pytest.fixture
+def recording(hass: HomeAssistant) -> None:
+    """Install the recorded payloads of the device."""
+    path = recording_path(hass, SERIAL)
+    os.makedirs(os.path.dirname(path))
+    shutil.copy(RECORDING, path)
+
+
+async def _async_replay(speed: float) -> list[IquaSoftenerData]:
+    replay_api = IquaSoftenerReplayApi(SERIAL, read_recording(str(RECORDING)), speed)
+    replayed = [await replay_api.async_get_data()]
+    await replay_api.async_run(replayed.append)
+    return replayed
+
+
+async def test_replay_follows_recorded_timestamps(delays: list[float]) -> None:
+    """Test payloads follow each other at the recorded pace divided by speed."""
+    replayed = await _async_replay(60)
+
+    assert [data.today_use for data in replayed] == [100, 100, 112, 130, 130, 131]
+    assert delays == [1.0] * 5
+
+
+async def test_replay_without_waiting(delays: list[float]) -> None:
+    """Test a speed of 0 replays as fast as possible."""
+    replayed = await _async_replay(0)
+
+    assert len(replayed) == 6
+    assert delays == [0.0] * 5
+
+
+async def _async_setup_replay(hass: HomeAssistant) -> IQuaDeviceCoordinator:
+    """Set up a replayed entry and wait until the whole recording is replayed."""
+    entry = await async_setup_entry(
+        hass, options={CONF_REPLAY_PAYLOADS: True, CONF_REPLAY_SPEED: 0}
+    )
+    coordinator = hass.data[DOMAIN][entry.entry_id].coordinator
+    for _ in range(100):
+        if coordinator.iqua_api.position == 6:
+            break
+        await asyncio.sleep(0)
+    await hass.async_block_till_done()
+    return coordinator
+
+
+async def test_replay_entry_is_deterministic(
+    hass: HomeAssistant, recording: None
+) -> None:
+    """Test replayed samples carry their recorded time, whatever the replay pace."""
+    outputs = []
+    for _ in range(2):
+        coordinator = await _async_setup_replay(hass)
+        history = coordinator.history
+        outputs.append(
+            {
+                "timestamp": coordinator.data.timestamp,
+                "last_record": history.last_record,
+                "total_usage": history.total_usage,
+                "hourly": [(bucket.start, bucket.usage) for bucket in history.hourly],
+                "leaks": vars(coordinator.leaks).copy(),
+            }
+        )
+        await async_unload_entries(hass)
+
+    assert outputs[0] == outputs[1]
+    assert outputs[0]["timestamp"] == datetime(2024, 3, 1, 6, 5, tzinfo=timezone.utc)
+    assert outputs[0]["total_usage"] == 31
+
+
+async def test_replay_entry_leaves_persistent_state_alone(
+    hass: HomeAssistant, hass_storage: dict[str, Any], recording: None
+) -> None:
+    """Test a replayed entry runs without the cloud and persists nothing.
+
+    Sockets are disabled, so any cloud request would fail the setup.
+    """
+    coordinator = await _async_setup_replay(hass)
+
+    assert hass.states.get("sensor.iqua_softener_today_water_usage").state == "131"
+    assert hass.states.get("sensor.iqua_softener_current_water_flow").state == "0.5"
+    assert (
+        hass.states.get("sensor.iqua_softener_lifetime_water_consumption").state
+        == "0.0"
+    )
+    assert coordinator.snapshot_store is None
+    assert not coordinator.history.persistent
+    assert not os.path.exists(coordinator.history.path)
+
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=STORAGE_SAVE_DELAY + 1)
+    )
+    await hass.async_block_till_done()
+    assert not [key for key in hass_storage if key.startswith(DOMAIN)]
+    await async_unload_entries(hass)
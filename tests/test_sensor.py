@@ -0,0 +1,202 @@
+"""Tests for the IQua Water Softener sensors, fed by a fake coordinator."""
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from homeassistant.const import UnitOfVolume
+from homeassistant.core import HomeAssistant, State
+from pytest_homeassistant_custom_component.common import (
+    mock_restore_cache_with_extra_data,
+)
+
+from custom_components.iqua_softener.api import parse_dashboard
+from custom_components.iqua_softener.const import (
+    ATTR_STALE,
+    CONF_WATER_PRICE,
+    DOMAIN,
+    VOLUME_FLOW_RATE_GALLONS_PER_MINUTE,
+    VOLUME_FLOW_RATE_LITERS_PER_MINUTE,
+)
+from custom_components.iqua_softener.coordinator import IQuaDeviceCoordinator
+from custom_components.iqua_softener.sensor import SENSOR_TYPES, IQuaSensor
+from custom_components.iqua_softener.services import SERVICE_REFRESH
+
+from .conftest import async_setup_entry, async_unload_entries, create_entry
+from .fake_ecowater import FakeEcowater, dashboard_payload
+
+LIFETIME_CONSUMPTION = "sensor.iqua_softener_lifetime_water_consumption"
+WATER_COST = "sensor.iqua_softener_water_cost"
+
+
+@pytest.fixture
+def coordinator(hass: HomeAssistant) -> IQuaDeviceCoordinator:
+    """Return a device coordinator without an account behind it."""
+    return IQuaDeviceCoordinator(
+        hass, MagicMock(), MagicMock(device_serial_number="SN0001")
+    )
+
+
+@pytest.fixture
+def sensors(
+    hass: HomeAssistant, coordinator: IQuaDeviceCoordinator
+) -> dict[str, IQuaSensor]:
+    """Return every projected sensor, keyed by sensor key."""
+    entry = create_entry(hass)
+    return {
+        description.key: IQuaSensor(
+            coordinator.iqua_api, coordinator, description, entry
+        )
+        for description in SENSOR_TYPES
+    }
+
+
+def _update(coordinator: IQuaDeviceCoordinator, **values) -> None:
+    coordinator.data = parse_dashboard(dashboard_payload(**values), coordinator.data)
+
+
+async def test_values_follow_updates(
+    coordinator: IQuaDeviceCoordinator, sensors: dict[str, IQuaSensor]
+) -> None:
+    """Test every sensor reads the latest data, not the first snapshot."""
+    _update(coordinator)
+    assert sensors["today_use"].native_value == 120
+    assert sensors["average_daily_use"].native_value == 300
+    assert sensors["state"].native_value == "Online"
+    regeneration = sensors["days_since_last_regeneration"].native_value
+
+    _update(
+        coordinator,
+        gallons_used_today=150,
+        avg_daily_use_gals=310,
+        days_since_last_recharge=4,
+        power="Offline",
+    )
+    assert sensors["today_use"].native_value == 150
+    assert sensors["average_daily_use"].native_value == 310
+    assert sensors["state"].native_value == "Offline"
+    assert sensors["days_since_last_regeneration"].native_value == (
+        regeneration - timedelta(days=1)
+    )
+
+
+async def test_units_follow_volume_unit(
+    coordinator: IQuaDeviceCoordinator, sensors: dict[str, IQuaSensor]
+) -> None:
+    """Test units change with the volume unit of the device."""
+    _update(coordinator)
+    assert sensors["today_use"].native_unit_of_measurement == UnitOfVolume.LITERS
+    assert (
+        sensors["current_water_flow"].native_unit_of_measurement
+        == VOLUME_FLOW_RATE_LITERS_PER_MINUTE
+    )
+    assert (
+        sensors["today_consumption"].native_unit_of_measurement
+        == UnitOfVolume.CUBIC_METERS
+    )
+    assert sensors["today_consumption"].native_value == pytest.approx(0.12)
+
+    _update(coordinator, volume_unit_enum=0)
+    assert sensors["today_use"].native_unit_of_measurement == UnitOfVolume.GALLONS
+    assert (
+        sensors["current_water_flow"].native_unit_of_measurement
+        == VOLUME_FLOW_RATE_GALLONS_PER_MINUTE
+    )
+    assert (
+        sensors["today_consumption"].native_unit_of_measurement
+        == UnitOfVolume.CUBIC_FEET
+    )
+
+
+async def test_salt_level_icon_and_color(
+    coordinator: IQuaDeviceCoordinator, sensors: dict[str, IQuaSensor]
+) -> None:
+    """Test the salt level icon and colour follow the level."""
+    sensor = sensors["salt_level_percent"]
+    _update(coordinator)
+    assert sensor.icon == "mdi:signal-cellular-3"
+    assert sensor.extra_state_attributes["icon_color"] == "#8BC34B"
+
+    _update(coordinator, salt_level_tenths={"value": 200, "percent": 40})
+    assert sensor.native_value == 40
+    assert sensor.icon == "mdi:signal-cellular-1"
+    assert sensor.extra_state_attributes["icon_color"] == "#F44336"
+
+
+async def test_last_reset_follows_regeneration(
+    coordinator: IQuaDeviceCoordinator, sensors: dict[str, IQuaSensor]
+) -> None:
+    """Test available water resets with every regeneration."""
+    sensor = sensors["total_water_available"]
+    _update(coordinator)
+    last_reset = sensor.last_reset
+
+    _update(coordinator, days_since_last_recharge=0)
+    assert sensor.last_reset == last_reset + timedelta(days=3)
+
+
+async def test_invalid_value_is_stale(
+    coordinator: IQuaDeviceCoordinator, sensors: dict[str, IQuaSensor]
+) -> None:
+    """Test an invalid value keeps the last valid one and is marked stale."""
+    sensor = sensors["today_use"]
+    assert not sensor.available
+
+    _update(coordinator)
+    assert sensor.available
+    assert ATTR_STALE not in sensor.extra_state_attributes
+
+    _update(coordinator, gallons_used_today=-1)
+    assert sensor.native_value == 120
+    assert sensor.extra_state_attributes[ATTR_STALE] is True
+
+
+async def _async_poll(
+    hass: HomeAssistant, fake_cloud: FakeEcowater, today_use: int
+) -> None:
+    fake_cloud.set_values("SN0001", gallons_used_today=today_use)
+    await hass.services.async_call(DOMAIN, SERVICE_REFRESH, {}, blocking=True)
+    await hass.async_block_till_done()
+
+
+async def test_consumption_across_midnight(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test a late reading adds nothing and only a reset starts a new day."""
+    await async_setup_entry(hass, options={CONF_WATER_PRICE: 2.0})
+
+    for today_use in (150, 140, 160, 20):
+        await _async_poll(hass, fake_cloud, today_use)
+
+    # 30 up to 150, nothing for the late 140, 10 up to 160 and 20 after midnight.
+    assert hass.states.get(LIFETIME_CONSUMPTION).state == "60.0"
+    # The price is per 1000 liters.
+    assert float(hass.states.get(WATER_COST).state) == pytest.approx(0.12)
+    await async_unload_entries(hass)
+
+
+async def test_consumption_restored(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test the total continues from the restored state and its last reading."""
+    mock_restore_cache_with_extra_data(
+        hass,
+        [
+            (
+                State(LIFETIME_CONSUMPTION, "500.0"),
+                {
+                    "native_value": 500.0,
+                    "native_unit_of_measurement": UnitOfVolume.LITERS,
+                    "last_today_use": 100,
+                    "days_since_last_regeneration": 3,
+                },
+            )
+        ],
+    )
+    await async_setup_entry(hass)
+    assert hass.states.get(LIFETIME_CONSUMPTION).state == "520.0"
+
+    await _async_poll(hass, fake_cloud, 110)
+    assert hass.states.get(LIFETIME_CONSUMPTION).state == "520.0"
+    await async_unload_entries(hass)
@@ -0,0 +1,59 @@
+"""Tests for the IQua Water Softener services."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.iqua_softener.const import DOMAIN
+from custom_components.iqua_softener.services import SERVICE_REFRESH
+
+from .conftest import async_setup_entry, async_unload_entries
+from .fake_ecowater import FakeEcowater
+
+
+async def test_refresh(hass: HomeAssistant, fake_cloud: FakeEcowater) -> None:
+    """Test the refresh service fetches the latest data."""
+    await async_setup_entry(hass)
+    fake_cloud.set_values("SN0001", gallons_used_today=150)
+
+    await hass.services.async_call(DOMAIN, SERVICE_REFRESH, {}, blocking=True)
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.iqua_softener_today_water_usage").state == "150"
+    await async_unload_entries(hass)
+
+
+async def test_concurrent_refreshes_are_coalesced(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test concurrent refresh calls share one dashboard request per softener."""
+    fake_cloud.add_device("SN0002")
+    await async_setup_entry(hass)
+    await async_setup_entry(hass, "SN0002")
+    fake_cloud.latency = 0.05
+    requests = fake_cloud.requests["dashboard"]
+
+    await asyncio.gather(
+        *(
+            hass.services.async_call(DOMAIN, SERVICE_REFRESH, {}, blocking=True)
+            for _ in range(2)
+        )
+    )
+
+    assert fake_cloud.requests["dashboard"] == requests + 2
+    await async_unload_entries(hass)
+
+
+async def test_refresh_failure_is_raised(
+    hass: HomeAssistant, fake_cloud: FakeEcowater
+) -> None:
+    """Test a failed refresh is reported to the caller."""
+    await async_setup_entry(hass)
+    del fake_cloud.dashboards["SN0001"]
+
+    with pytest.raises(HomeAssistantError, match="Refreshing the iQua cloud failed"):
+        await hass.services.async_call(DOMAIN, SERVICE_REFRESH, {}, blocking=True)
+    await async_unload_entries(hass)